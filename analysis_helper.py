@@ -4,6 +4,8 @@ import networkx as nx
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datasources.database import User, Profile, Context, Graph
+from pipelines.hashtag_frequency import HashtagFrequency
+from pipelines.ragged_array import RaggedArray
 
 
 class AnalysisHelper:
@@ -102,9 +104,9 @@ class AnalysisHelper:
         no_all_nodes = self.__get_contexts_single(
             'network_metrics', 'graph_summary', 'graph_summary', 'csv')[['no_nodes']] \
             .rename(columns={'no_nodes': 'no_all_nodes'})
-        no_cd_nodes = self.__get_contexts_single('network_creation', 'create_nodes', 'nodes', 'csv')[['user_name']] \
-            .reset_index().drop_duplicates().set_index('name').groupby('name').count() \
-            .rename(columns={'user_name': 'no_cd_nodes'})
+        no_cd_nodes = pd.DataFrame([{'name': context_name, 'no_cd_nodes': nodes.index.nunique()}
+                                    for context_name, nodes in self.__get_contexts_multiple(
+                                        'network_creation', 'create_nodes', 'nodes', 'csv')]).set_index('name')
 
         # compute stats for each context
         context_stats = no_all_nodes.merge(no_cd_nodes, left_index=True, right_index=True)
@@ -135,11 +137,16 @@ class AnalysisHelper:
         return c_summary
 
     def __get_shared_nodes(self, *file_args):
-        nodes = self.__get_contexts_single(*file_args).user_name.reset_index().drop_duplicates().user_name
+        # user ids are the index or a column of the nodes
+        nodes = pd.concat([n.reset_index()[['user_id', 'user_name']].assign(name=context_name)
+                           for context_name, n in self.__get_contexts_multiple(*file_args)]) \
+            .drop_duplicates(['name', 'user_id'])
 
-        # get shared nodes
-        shared_nodes = nodes.value_counts().where(lambda x: x > 1).dropna().astype(int).to_frame() \
-            .rename(columns={'user_name': 'no_participations'})
+        # get shared nodes by their global user ids
+        no_participations = nodes['user_id'].value_counts()
+        shared_nodes = nodes.drop_duplicates('user_id').set_index('user_id')[['user_name']]
+        shared_nodes['no_participations'] = no_participations
+        shared_nodes = shared_nodes[shared_nodes['no_participations'] > 1]
 
         return shared_nodes
 
@@ -161,11 +168,11 @@ class AnalysisHelper:
         # add user information
         with self.datasources.database.session_scope() as session:
             userinfo = pd.read_sql(session.query(User, Profile.follower_rank).join(Profile.user)
-                                   .filter(User.user_name.in_(shared_nodes.index.tolist())).statement,
-                                   con=session.bind, index_col='user_name')
+                                   .filter(User.id.in_(shared_nodes.index.tolist())).statement,
+                                   con=session.bind, index_col='id')
 
-        shared_nodes = userinfo.merge(shared_nodes, left_index=True, right_index=True) \
-            .drop(['id', 'following', 'followers', 'tweets', 'join_date'], axis=1) \
+        shared_nodes = userinfo.merge(shared_nodes[['no_participations']], left_index=True, right_index=True) \
+            .drop(['following', 'followers', 'tweets', 'join_date'], axis=1) \
             .sort_values(by='no_participations', ascending=False)
 
         return shared_nodes
@@ -174,14 +181,14 @@ class AnalysisHelper:
         from matplotlib.ticker import MaxNLocator
 
         nodes = self.__get_contexts_single(
-            'community_detection', 'add_communities_to_nodes', 'nodes', 'csv').reset_index()[['user_name', 'name']]
+            'community_detection', 'add_communities_to_nodes', 'nodes', 'csv').reset_index()[['user_id', 'name']]
 
         # get dummies from event names
         name_dummies = pd.get_dummies(nodes['name'])
-        node_participations = pd.concat([nodes['user_name'], name_dummies], axis=1)
+        node_participations = pd.concat([nodes['user_id'], name_dummies], axis=1)
 
         # sum all events appearances by user
-        node_participations = node_participations.groupby('user_name').sum()
+        node_participations = node_participations.groupby('user_id').sum()
 
         # keep events with > 1 appearance
         node_participations = node_participations[node_participations.sum(axis=1) > 1]
@@ -234,28 +241,26 @@ class AnalysisHelper:
         return self.datasources.files.read('bipartite_graph', 'get_user_network', 'user_network', 'csv')
 
     def get_user_timelines(self):
-        return self.datasources.files.read('user_timelines', 'get_user_timelines', 'user_timelines', 'csv')
+        user_timelines = self.datasources.files.read('user_timelines', 'get_user_timelines', 'user_timelines', 'csv')
+        for column in user_timelines.columns.intersection(['hashtags', 'urls', 'mentions', 'replies']):
+            user_timelines[column] = RaggedArray.from_strings(user_timelines[column]).to_lists()
+
+        return user_timelines
 
     def get_new_contexts(self):
         return self.datasources.files.read('context_detector', 'get_new_contexts', 'new_contexts', 'csv')
 
     def show_peaks(self, hashtag_list):
-        hashtag_frequency = \
-            self.datasources.files.read('context_detector', 'hashtags_frequency', 'hashtags_frequency', 'csv')
+        hashtag_frequency = HashtagFrequency.from_arrays(
+            self.datasources.files.read('context_detector', 'hashtags_frequency', 'hashtags_frequency', 'npz'))
         hashtag_peaks = \
             self.datasources.files.read('context_detector', 'find_peaks', 'hashtags_peaks', 'csv')
 
-        hashtag_frequency = hashtag_frequency[
-            hashtag_frequency['hashtag'].isin(hashtag_peaks['hashtag'].drop_duplicates())]
-
         if hashtag_list:
-            hashtag_frequency = hashtag_frequency[hashtag_frequency['hashtag'].isin(hashtag_list)]
             hashtag_peaks = hashtag_peaks[hashtag_peaks['hashtag'].isin(hashtag_list)]
 
-        for hashtag, timeline in hashtag_frequency.groupby('hashtag'):
-            empty_timeline = pd.date_range(timeline['date'].min(), timeline['date'].max())
-            timeline = timeline.set_index('date')['count']
-            timeline = timeline.reindex(empty_timeline, fill_value=0).to_frame()
+        for hashtag in sorted(hashtag_peaks['hashtag'].drop_duplicates()):
+            timeline = hashtag_frequency.timeline(hashtag).to_frame()
 
             peaks = hashtag_peaks[hashtag_peaks['hashtag'] == hashtag]
             ranges = peaks.apply(lambda x: pd.date_range(x['start_date'], x['end_date']).date, axis=1).explode()
@@ -322,7 +327,7 @@ class AnalysisHelper:
 
     # table 3 - top repeated users
     def get_table3(self):
-        table_3 = self.get_common_nodes().reset_index()
+        table_3 = self.get_common_nodes().reset_index(drop=True)
         table_3 = table_3.head(11).round(decimals=2).sort_values(by=['no_participations', 'follower_rank'],
                                                                  ascending=False)
         table_3.rename(columns={'index': 'username'}, inplace=True)
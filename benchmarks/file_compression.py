@@ -0,0 +1,74 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import pandas as pd
+from benchmarks.synthetic_data import SyntheticTwitter
+from datasources.files import Files
+from datasources.tw_api import TwApi
+
+COMPRESSIONS = [None, 'gzip', 'zstd']
+
+
+def synthetic_files(no_tweets):
+    # raw tweets as harvested (json) and parsed tweets as the user timelines (csv)
+    synthetic_twitter = SyntheticTwitter(no_tweets, no_contexts=1)
+    raw_tweets = [synthetic_twitter.raw_tweet(i) for i in range(no_tweets)]
+    timelines = pd.DataFrame.from_records([TwApi.parse_tweet(raw_tw) for raw_tw in raw_tweets])
+
+    return {'json': raw_tweets, 'csv': timelines}
+
+
+def timeit(func, *args):
+    start_time = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start_time
+
+
+def run_compression(file_content, file_extension, compression, work_path):
+    files = Files(work_path)
+    files.add_file_model('benchmark', 'file_compression', 'file', file_extension,
+                         w_kwargs={'index': False} if file_extension == 'csv' else None, compression=compression)
+    file_path = files.model['benchmark']['file_compression'][f'file.{file_extension}']['path']
+
+    write_time = timeit(files.write, file_content, 'benchmark', 'file_compression', 'file', file_extension)
+    read_time = timeit(files.read, 'benchmark', 'file_compression', 'file', file_extension)
+
+    return os.path.getsize(file_path), write_time, read_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description='artifact compression benchmark')
+    parser.add_argument('--tweets', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+
+    results = []
+    work_path = tempfile.mkdtemp()
+    try:
+        for no_tweets in args.tweets:
+            for file_extension, file_content in synthetic_files(no_tweets).items():
+                size = None
+                for compression in COMPRESSIONS:
+                    file_size, write_time, read_time = run_compression(
+                        file_content, file_extension, compression, os.path.join(work_path, str(compression)))
+                    # throughput of the uncompressed content
+                    size = size or file_size
+
+                    results.append({
+                        'tweets': no_tweets,
+                        'file': file_extension,
+                        'compression': compression or 'none',
+                        'size (MB)': round(file_size / 2 ** 20, 2),
+                        'ratio': round(size / file_size, 2),
+                        'write (MB/s)': round(size / 2 ** 20 / write_time, 1),
+                        'read (MB/s)': round(size / 2 ** 20 / read_time, 1)
+                    })
+    finally:
+        shutil.rmtree(work_path)
+
+    print(pd.DataFrame(results).set_index(['tweets', 'file', 'compression']).to_string())
+
+
+if __name__ == '__main__':
+    main()
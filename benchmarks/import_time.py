@@ -0,0 +1,71 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.synthetic_data import SyntheticTwitter
+
+PROJECT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# heavy dependencies only the tasks computing an artifact import
+LAZY_MODULES = ['demon', 'infomap', 'networkx', 'pquality', 'requests_cache', 'scipy', 'tqdm', 'TwitterAPI']
+
+
+def import_time(statement):
+    # wall time of the statement in a new interpreter and self and cumulative import times (us) of each module
+    start_time = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                             cwd=PROJECT_PATH, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    wall_time = time.perf_counter() - start_time
+
+    modules = []
+    for line in process.stderr.splitlines():
+        if line.startswith('import time:'):
+            self_time, cumulative_time, module_name = line[len('import time:'):].split('|')
+            if self_time.strip().isdigit():
+                modules.append((module_name.strip(), int(self_time), int(cumulative_time)))
+
+    return wall_time, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description='startup time of the orchestrator and the datasources')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    work_path = tempfile.mkdtemp(prefix='tna_benchmark_')
+    try:
+        input_path = os.path.join(work_path, 'input')
+        output_path = os.path.join(work_path, 'output')
+        SyntheticTwitter(1000).write_project(input_path, output_path)
+
+        statements = {
+            'import orchestrator': 'import orchestrator',
+            'Datasources()': f'import orchestrator; orchestrator.Datasources({input_path!r}, {output_path!r})'
+        }
+
+        eager_modules = set()
+        for statement_name, statement in statements.items():
+            runs = [import_time(statement) for _ in range(args.repeat)]
+            wall_time, modules = min(runs, key=lambda r: r[0])
+            root_modules = {m[0].split('.')[0] for m in modules}
+            eager_modules |= root_modules & set(LAZY_MODULES)
+
+            print(f'{statement_name:<20} {wall_time:>8.4f} s wall time, {sum(m[1] for m in modules) / 10 ** 6:.4f} s '
+                  f'importing {len(modules)} modules (best of {args.repeat})')
+            for module_name, _, cumulative_time in sorted(
+                    (m for m in modules if '.' not in m[0]), key=lambda m: -m[2])[:args.top]:
+                print(f'    {module_name:<30} {cumulative_time / 10 ** 6:>8.4f} s')
+    finally:
+        shutil.rmtree(work_path, ignore_errors=True)
+
+    if eager_modules:
+        print(f'ERROR lazy modules imported at startup: {", ".join(sorted(eager_modules))}')
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import argparse
+import io
+import time
+import numpy as np
+import pandas as pd
+from pipelines.cooccurrence import CoOccurrence
+from pipelines.helper import str_to_list
+from pipelines.ragged_array import RaggedArray
+
+# the legacy mentions union concatenates every list of the frame, skip it above this size
+LEGACY_MAX_TWEETS = 200000
+
+
+def synthetic_timelines(no_users, tweets_per_user, no_hashtags=5000, seed=0):
+    rng = np.random.RandomState(seed)
+    no_tweets = no_users * tweets_per_user
+
+    # power-law hashtag popularity and up to 4 hashtags/mentions per tweet
+    hashtags = np.array([f'#h{i}' for i in range(no_hashtags)], dtype=object)
+    users = np.array([f'u{i}' for i in range(no_users)], dtype=object)
+    hashtag_ids = np.minimum(rng.zipf(1.5, size=(no_tweets, 4)) - 1, no_hashtags - 1)
+    mention_ids = np.minimum(rng.zipf(1.5, size=(no_tweets, 4)) - 1, no_users - 1)
+    hashtag_lengths = rng.randint(0, 5, size=no_tweets)
+    mention_lengths = rng.randint(0, 3, size=no_tweets)
+
+    return pd.DataFrame({
+        'user_name': np.repeat(users, tweets_per_user),
+        'hashtags': [hashtags[ids[:n]].tolist() for ids, n in zip(hashtag_ids, hashtag_lengths)],
+        'mentions': [users[ids[:n]].tolist() for ids, n in zip(mention_ids, mention_lengths)]
+    })
+
+
+def legacy_user_hashtag(timelines):
+    network = timelines[['user_name', 'hashtags']].groupby('user_name').sum()
+    network = network.explode('hashtags').rename(columns={'hashtags': 'hashtag'}).reset_index().dropna()
+
+    return network.groupby(['user_name', 'hashtag']).size().reset_index(name='weight')
+
+
+def exploded_user_hashtag(timelines):
+    network = timelines[['user_name', 'hashtags']].explode('hashtags').dropna() \
+        .rename(columns={'hashtags': 'hashtag'})
+
+    return network.groupby(['user_name', 'hashtag']).size().reset_index(name='weight')
+
+
+def sparse_user_hashtag(timelines):
+    return CoOccurrence(timelines[['user_name', 'hashtags']]).user_hashtag_network()
+
+
+def legacy_mentioned_users(timelines):
+    return set(timelines['user_name'].tolist() + timelines['mentions'].sum())
+
+
+def exploded_mentioned_users(timelines):
+    return set(timelines['user_name']) | set(timelines['mentions'].explode().dropna())
+
+
+def load_lists(csv):
+    return pd.read_csv(io.StringIO(csv), converters={'hashtags': str_to_list, 'mentions': str_to_list})
+
+
+def load_ragged(csv):
+    timelines = pd.read_csv(io.StringIO(csv), dtype={'hashtags': str, 'mentions': str})
+    return RaggedArray.from_strings(timelines['hashtags']), RaggedArray.from_strings(timelines['mentions'])
+
+
+def timeit(func, *args):
+    start_time = time.perf_counter()
+    func(*args)
+    return round(time.perf_counter() - start_time, 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='list column aggregation benchmark')
+    parser.add_argument('--users', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--tweets-per-user', type=int, default=20)
+    args = parser.parse_args()
+
+    results = []
+    for no_users in args.users:
+        timelines = synthetic_timelines(no_users, args.tweets_per_user)
+        no_tweets = len(timelines.index)
+        csv = timelines.to_csv(index=False)
+
+        results.append({
+            'users': no_users,
+            'tweets': no_tweets,
+            'user_hashtag_legacy (s)': timeit(legacy_user_hashtag, timelines),
+            'user_hashtag_exploded (s)': timeit(exploded_user_hashtag, timelines),
+            'user_hashtag_sparse (s)': timeit(sparse_user_hashtag, timelines),
+            'mentions_legacy (s)':
+                timeit(legacy_mentioned_users, timelines) if no_tweets <= LEGACY_MAX_TWEETS else None,
+            'mentions_exploded (s)': timeit(exploded_mentioned_users, timelines),
+            'load_lists (s)': timeit(load_lists, csv),
+            'load_ragged (s)': timeit(load_ragged, csv)
+        })
+
+    print(pd.DataFrame(results).set_index('users').to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import resource
+import shutil
+import tempfile
+import time
+from benchmarks.synthetic_data import SyntheticTwitter
+from datasources import Datasources
+from orchestrator import Orchestrator
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'pipelines.json')
+
+# timings below this many seconds are too noisy to flag as regressions
+MIN_REGRESSION_TIME = .5
+
+
+def run_pipeline(pipeline, datasources, *args):
+    start_max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start_time = time.perf_counter()
+    pipeline(datasources, *args).execute()
+
+    return {
+        'wall_time': time.perf_counter() - start_time,
+        'max_rss_delta_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - start_max_rss
+    }
+
+
+def run_pipelines(no_tweets, no_contexts, work_path, api_time_scale=0.):
+    # phase 1 pipelines are summed over the contexts
+    input_path = os.path.join(work_path, 'input')
+    output_path = os.path.join(work_path, 'output')
+    synthetic_twitter = SyntheticTwitter(no_tweets, no_contexts)
+    synthetic_twitter.write_project(input_path, output_path, time_scale=api_time_scale)
+    datasources = Datasources(input_path, output_path)
+
+    results = {}
+    for context_name in datasources.contexts.get_context_names():
+        for p in Orchestrator.phase_1_pipelines:
+            result = run_pipeline(p, datasources, context_name)
+            pipeline_result = results.setdefault(p.__name__, {'wall_time': 0, 'max_rss_delta_kb': 0})
+            pipeline_result['wall_time'] += result['wall_time']
+            pipeline_result['max_rss_delta_kb'] = max(pipeline_result['max_rss_delta_kb'], result['max_rss_delta_kb'])
+
+    for p in Orchestrator.phase_2_pipelines:
+        results[p.__name__] = run_pipeline(p, datasources)
+
+    return {p: {k: round(v, 4) for k, v in r.items()} for p, r in results.items()}
+
+
+def find_regressions(results, baseline, tolerance):
+    regressions = []
+    for no_tweets, scale_results in results.items():
+        for pipeline_name, result in scale_results.items():
+            baseline_result = baseline.get(no_tweets, {}).get(pipeline_name)
+            if baseline_result and result['wall_time'] > MIN_REGRESSION_TIME and \
+                    result['wall_time'] > baseline_result['wall_time'] * (1 + tolerance):
+                regressions.append((no_tweets, pipeline_name, baseline_result['wall_time'], result['wall_time']))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='phase 1 and phase 2 pipelines on synthetic Twitter-like data')
+    parser.add_argument('--tweets', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--contexts', type=int, default=2)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--api-time-scale', type=float, default=0.,
+                        help='scale of replayed API latency and rate limits, 0 measures computation only')
+    parser.add_argument('--tolerance', type=float, default=.25, help='allowed slowdown wrt the baseline')
+    args = parser.parse_args()
+
+    results = {}
+    for no_tweets in args.tweets:
+        work_path = tempfile.mkdtemp(prefix='tna_benchmark_')
+        try:
+            results[str(no_tweets)] = run_pipelines(no_tweets, args.contexts, work_path, args.api_time_scale)
+        finally:
+            shutil.rmtree(work_path, ignore_errors=True)
+
+        for pipeline_name, result in results[str(no_tweets)].items():
+            print(f'tweets={no_tweets:>9} {pipeline_name:<28} {result["wall_time"]:>10.4f} s '
+                  f'{result["max_rss_delta_kb"]:>10} KB max rss growth')
+
+    if args.save_baseline:
+        if not os.path.exists(os.path.dirname(args.baseline)):
+            os.makedirs(os.path.dirname(args.baseline))
+        baseline = {}
+        if os.path.isfile(args.baseline):
+            with open(args.baseline) as json_file:
+                baseline = json.load(json_file)
+        baseline.update(results)
+        with open(args.baseline, 'w') as json_file:
+            json.dump(baseline, json_file, indent=2, sort_keys=True)
+        print(f'baseline saved to {args.baseline}')
+    elif os.path.isfile(args.baseline):
+        with open(args.baseline) as json_file:
+            regressions = find_regressions(results, json.load(json_file), args.tolerance)
+
+        for no_tweets, pipeline_name, baseline_time, wall_time in regressions:
+            print(f'REGRESSION tweets={no_tweets} {pipeline_name}: {baseline_time:.4f} s -> {wall_time:.4f} s')
+        if regressions:
+            raise SystemExit(1)
+    else:
+        print(f'no baseline in {args.baseline}, run with --save-baseline to store one')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+
+START_DATE = date(2019, 1, 1)
+TW_DATE_FORMAT = '%a %b %d %H:%M:%S +0000 %Y'
+
+# the harvest search and user timelines are capped as by the pipelines and the API
+MAX_SEARCH_TWEETS = 200
+MAX_TIMELINE_TWEETS = 3200
+
+
+class SyntheticTwitter:
+    # power-law authors, mentions and hashtags, each tweet uses at least one hashtag of its context
+    def __init__(self, no_tweets, no_contexts=2, context_days=14, seed=0, stream_share=0.):
+        rng = np.random.RandomState(seed)
+        self.no_tweets = no_tweets
+        self.no_users = max(no_tweets // 20, 100)
+        self.no_hashtags = max(no_tweets // 50, 100)
+        self.rng = rng
+
+        self.users = np.array([f'user{i}' for i in range(self.no_users)], dtype=object)
+        self.hashtags = np.array([f'tag{i}' for i in range(self.no_hashtags)], dtype=object)
+        self.contexts = pd.DataFrame({
+            'name': [f'context{c}' for c in range(no_contexts)],
+            'start_date': [START_DATE + timedelta(days=c * context_days) for c in range(no_contexts)],
+            'end_date': [START_DATE + timedelta(days=(c + 1) * context_days - 1) for c in range(no_contexts)],
+            'hashtags': [[f'context{c}tag{h}' for h in range(3)] for c in range(no_contexts)],
+            'location': 'world'
+        })
+
+        self.authors = self.__zipf(self.no_tweets, self.no_users)
+        self.tweet_contexts = rng.randint(0, no_contexts, size=self.no_tweets)
+        self.dates = np.datetime64(START_DATE) + \
+            (self.tweet_contexts * context_days * 86400 + rng.randint(0, context_days * 86400, size=self.no_tweets)) \
+            .astype('timedelta64[s]')
+        self.context_hashtags = rng.randint(0, 3, size=self.no_tweets)
+        # the last stream_share of each context is left out of its harvest, it is only in the filtered stream
+        self.is_streamed = (self.dates - np.datetime64(START_DATE)).astype(np.int64) - \
+            self.tweet_contexts * context_days * 86400 >= (1 - stream_share) * context_days * 86400
+
+        # up to 3 other hashtags and 3 mentions per tweet
+        self.hashtag_lengths = rng.randint(0, 4, size=self.no_tweets)
+        self.mention_lengths = rng.randint(0, 4, size=self.no_tweets)
+        self.hashtag_ids = self.__zipf((self.no_tweets, 3), self.no_hashtags)
+        self.mention_ids = self.__zipf((self.no_tweets, 3), self.no_users)
+        self.followers = self.__zipf(self.no_users, 10 ** 6)
+
+        # user timelines, most recent tweets first
+        self.timeline_order = np.lexsort((-self.dates.astype(np.int64), self.authors))
+        self.timeline_bounds = np.searchsorted(self.authors[self.timeline_order], np.arange(self.no_users + 1))
+
+    def __zipf(self, size, no_values):
+        return np.minimum(self.rng.zipf(1.6, size=size) - 1, no_values - 1)
+
+    def raw_tweet(self, i):
+        hashtags = [self.contexts['hashtags'].iat[self.tweet_contexts[i]][self.context_hashtags[i]]] + \
+            self.hashtags[self.hashtag_ids[i, :self.hashtag_lengths[i]]].tolist()
+        mentions = self.users[self.mention_ids[i, :self.mention_lengths[i]]].tolist()
+
+        return {
+            'id': int(i),
+            'created_at': self.dates[i].astype(datetime).strftime(TW_DATE_FORMAT),
+            'user': {'screen_name': self.users[self.authors[i]]},
+            'lang': 'en',
+            'favorite_count': int(i % 7),
+            'retweet_count': int(i % 5),
+            'in_reply_to_screen_name': mentions[0] if mentions and i % 10 == 0 else None,
+            'text': ' '.join(['synthetic tweet'] + ['#' + h for h in hashtags] + ['@' + m for m in mentions]),
+            'entities': {
+                'hashtags': [{'text': h} for h in hashtags],
+                'user_mentions': [{'screen_name': m} for m in mentions],
+                'urls': []
+            }
+        }
+
+    def raw_user(self, user_id):
+        return {
+            'screen_name': self.users[user_id],
+            'description': f'synthetic user {user_id}',
+            'url': None,
+            'location': 'world',
+            'followers_count': int(self.followers[user_id]),
+            'friends_count': int(self.followers[(user_id + 1) % self.no_users]),
+            'favourites_count': int(user_id % 1000),
+            'statuses_count': int(self.timeline_bounds[user_id + 1] - self.timeline_bounds[user_id]),
+            'lang': 'en',
+            'created_at': datetime(2010, 1, 1).strftime(TW_DATE_FORMAT),
+            'name': f'User {user_id}'
+        }
+
+    def context_tweets(self, context_name):
+        context_id = self.contexts.index[self.contexts['name'] == context_name][0]
+        return np.flatnonzero((self.tweet_contexts == context_id) & ~self.is_streamed)
+
+    def stream_tweets(self):
+        streamed_tweets = np.flatnonzero(self.is_streamed)
+        return streamed_tweets[np.argsort(self.dates[streamed_tweets], kind='stable')]
+
+    def write_project(self, input_path, output_path, latency=.2, time_scale=1.):
+        # project input configuration, recorded API responses and the harvested stream of every context
+        if not os.path.exists(input_path):
+            os.makedirs(input_path)
+
+        contexts = self.contexts.copy()
+        contexts['hashtags'] = contexts['hashtags'].apply(lambda h: ' '.join('#' + t for t in h))
+        contexts.to_csv(os.path.join(input_path, 'contexts.csv'), index=False)
+
+        with open(os.path.join(input_path, 'community_detection.json'), 'w') as json_file:
+            json.dump({'name': 'infomap', 'kwargs': {}}, json_file)
+        with open(os.path.join(input_path, 'context_detection.json'), 'w') as json_file:
+            json.dump({
+                'rank': 'rank_3',
+                'top_no_users': 100,
+                'max_no_tweets': 3200,
+                'start_date': str(self.contexts['start_date'].min()),
+                'end_date': str(self.contexts['end_date'].max())
+            }, json_file)
+        with open(os.path.join(input_path, 'tw_api.json'), 'w') as json_file:
+            json.dump({
+                'backend': 'replay',
+                'replay': {'path': 'tw_api_replay', 'latency': latency, 'time_scale': time_scale}
+            }, json_file)
+        self.write_fixtures(os.path.join(input_path, 'tw_api_replay'))
+
+        stream_path = os.path.join(output_path, 'files', 'context_harvesting', 'harvest_context')
+        if not os.path.exists(stream_path):
+            os.makedirs(stream_path)
+
+        for context_name in self.contexts['name']:
+            with open(os.path.join(stream_path, f'{context_name}__stream.json'), 'w') as json_file:
+                json_file.write('[')
+                for j, i in enumerate(self.context_tweets(context_name)):
+                    json_file.write((',' if j else '') + json.dumps(self.raw_tweet(i)))
+                json_file.write(']')
+
+    def write_fixtures(self, fixtures_path):
+        if not os.path.exists(fixtures_path):
+            os.makedirs(fixtures_path)
+
+        with open(os.path.join(fixtures_path, 'search.jsonl'), 'w') as fixture_file:
+            for _, context in self.contexts.iterrows():
+                fixture_file.write(json.dumps({
+                    'query': ' OR '.join('#' + h for h in context['hashtags']),
+                    'tweets': [self.raw_tweet(i) for i in self.context_tweets(context['name'])[:MAX_SEARCH_TWEETS]]
+                }) + '\n')
+
+        with open(os.path.join(fixtures_path, 'timelines.jsonl'), 'w') as fixture_file:
+            for user_id in np.flatnonzero(np.diff(self.timeline_bounds)):
+                timeline = self.timeline_order[self.timeline_bounds[user_id]:self.timeline_bounds[user_id + 1]]
+                fixture_file.write(json.dumps({
+                    'screen_name': self.users[user_id],
+                    'tweets': [self.raw_tweet(i) for i in timeline[:MAX_TIMELINE_TWEETS]]
+                }) + '\n')
+
+        with open(os.path.join(fixtures_path, 'users.jsonl'), 'w') as fixture_file:
+            for user_id in range(self.no_users):
+                fixture_file.write(json.dumps(self.raw_user(user_id)) + '\n')
+
+        with open(os.path.join(fixtures_path, 'stream.jsonl'), 'w') as fixture_file:
+            for i in self.stream_tweets():
+                fixture_file.write(json.dumps(self.raw_tweet(i)) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='synthetic Twitter-like project')
+    parser.add_argument('project_name')
+    parser.add_argument('--tweets', type=int, default=10000)
+    parser.add_argument('--contexts', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=.2, help='replayed API latency (s)')
+    parser.add_argument('--time-scale', type=float, default=1., help='scale of replayed latency and rate limits')
+    parser.add_argument('--stream-share', type=float, default=0., help='share of the tweets only in the stream')
+    args = parser.parse_args()
+
+    synthetic_twitter = SyntheticTwitter(args.tweets, args.contexts, seed=args.seed, stream_share=args.stream_share)
+    synthetic_twitter.write_project(os.path.join('input', args.project_name), os.path.join('output', args.project_name),
+                                    args.latency, args.time_scale)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.synthetic_data import SyntheticTwitter
+from datasources.tw_api import TwApi
+
+
+def fetch_timelines(tw_api, user_names, max_workers):
+    # user timelines fetched sequentially (1 worker) or concurrently from the replay backend
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        timelines = list(executor.map(lambda u: tw_api.get_user_timeline(u, n=3200), user_names))
+    elapsed = time.perf_counter() - start_time
+
+    return round(elapsed, 4), sum(len(t) for t in timelines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='concurrent timeline fetches on the replayed Twitter API')
+    parser.add_argument('--tweets', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--latency', type=float, default=.05)
+    parser.add_argument('--requests-per-window', type=int, default=300)
+    parser.add_argument('--window', type=float, default=10.)
+    args = parser.parse_args()
+
+    work_path = tempfile.mkdtemp(prefix='tna_benchmark_')
+    try:
+        synthetic_twitter = SyntheticTwitter(args.tweets)
+        synthetic_twitter.write_fixtures(os.path.join(work_path, 'tw_api_replay'))
+        with open(os.path.join(work_path, 'tw_api.json'), 'w') as json_file:
+            json.dump({
+                'backend': 'replay',
+                'replay': {
+                    'latency': args.latency,
+                    'rate_limits': {'user_timeline': {'requests': args.requests_per_window, 'window': args.window}}
+                }
+            }, json_file)
+
+        user_names = synthetic_twitter.users[:args.users].tolist()
+        for max_workers in args.workers:
+            tw_api = TwApi(work_path, work_path)
+            elapsed, no_tweets = fetch_timelines(tw_api, user_names, max_workers)
+            print(f'workers={max_workers:>3} users={len(user_names)} tweets={no_tweets} {elapsed:>10.4f} s')
+    finally:
+        shutil.rmtree(work_path, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+import json
+import os
+
+
+class ContextExpansion:
+    def __init__(self, input_path):
+        self.input_path = os.path.join(input_path, 'context_expansion.json')
+
+    def get_config(self):
+        # contexts are not expanded without settings
+        context_expansion_settings = {
+            'no_expansions': 0,
+            'max_workers': 1,
+            'max_users_per_round': None,
+            'api_budget': None,
+            'max_no_tweets': 3200
+        }
+
+        if os.path.isfile(self.input_path):
+            with open(self.input_path, 'r') as json_file:
+                context_expansion_settings.update(json.load(json_file))
+
+        return context_expansion_settings
@@ -1,4 +1,5 @@
 from .database import Database
-from .model import User, Profile, Context, Graph, Partition, Community, UserCommunity, UserContext
+from .model import User, Profile, Context, Graph, Partition, Community, UserCommunity, UserContext, UserRank
 
-__all__ = ['Database', 'User', 'Profile', 'Context', 'Graph', 'Partition', 'Community', 'UserCommunity', 'UserContext']
+__all__ = ['Database', 'User', 'Profile', 'Context', 'Graph', 'Partition', 'Community', 'UserCommunity', 'UserContext',
+           'UserRank']
@@ -1,9 +1,10 @@
 from sqlalchemy import create_engine
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker, scoped_session
-from datasources.database.model import Base
+from datasources.database.model import Base, User, Context, UserContext, UserRank
 from contextlib import contextmanager
 import os
+import pandas as pd
 
 
 class Database:
@@ -16,11 +17,17 @@ class Database:
         elif os.path.isfile(self.output_db_path) and reset_db:
             os.remove(self.output_db_path)
 
-        self.engine = create_engine('sqlite:///' + self.output_db_path)
+        # workers of other processes wait for the database lock
+        self.engine = create_engine('sqlite:///' + self.output_db_path, connect_args={'timeout': 60})
         Base.metadata.create_all(self.engine)
         self.session_factory = sessionmaker(bind=self.engine)
         self.session = scoped_session(self.session_factory)
 
+    def reset(self):
+        # tables are created again empty
+        Base.metadata.drop_all(self.engine)
+        Base.metadata.create_all(self.engine)
+
     @contextmanager
     def session_scope(self):
         # Provide a transactional scope around a series of operations
@@ -33,3 +40,21 @@ class Database:
             raise
         finally:
             session.close()
+
+    def get_top_ranked_users(self, rank_name, limit=100, offset=0, context_name=None):
+        # top users by rank score, optionally only among users of a context
+        with self.session_scope() as session:
+            query = session.query(User.id, User.user_name, UserRank.score.label('rank')) \
+                .join(UserRank, User.id == UserRank.user_id) \
+                .filter(UserRank.name == rank_name)
+
+            if context_name:
+                query = query.join(UserContext, User.id == UserContext.user_id) \
+                    .join(Context, UserContext.context_id == Context.id) \
+                    .filter(Context.name == context_name)
+
+            query = query.order_by(UserRank.score.desc(), User.user_name.asc()).limit(limit).offset(offset)
+
+            top_ranked_users = pd.read_sql(query.statement, con=session.bind, index_col='id')
+
+        return top_ranked_users
@@ -1,5 +1,5 @@
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, Float, String, Boolean, Date, ForeignKey, CheckConstraint
+from sqlalchemy import Column, Integer, Float, String, Boolean, Date, ForeignKey, CheckConstraint, Index
 from sqlalchemy.orm import relationship
 
 Base = declarative_base()
@@ -27,6 +27,8 @@ class User(Base):
                                     cascade='all, delete-orphan', single_parent=True)
     user_contexts = relationship('UserContext', back_populates='user',
                                  cascade='all, delete-orphan', single_parent=True)
+    user_ranks = relationship('UserRank', back_populates='user',
+                              cascade='all, delete-orphan', single_parent=True)
 
     def __repr__(self):
         return f'<User(' \
@@ -201,3 +203,19 @@ class UserContext(Base):
             f'topical_attachment={self.topical_attachment}, ' \
             f'topical_focus={self.topical_focus}, ' \
             f'topical_strength={self.topical_strength})>'
+
+
+class UserRank(Base):
+    __tablename__ = 'user_ranks'
+    __table_args__ = (Index('ix_user_ranks_name_score', 'name', 'score'),)
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    name = Column(String(20), primary_key=True)
+    score = Column(Float)
+
+    user = relationship(User, back_populates='user_ranks')
+
+    def __repr__(self):
+        return f'<UserRank(' \
+            f'name={self.name}, ' \
+            f'score={self.score})>'
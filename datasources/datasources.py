@@ -1,16 +1,60 @@
-from .database.database import Database
+import threading
 from .files import Files
-from .contexts import Contexts
 from .community_detection import CommunityDetection
 from .context_detection import ContextDetection
-from .tw_api import TwApi
+from .context_expansion import ContextExpansion
+from .temporal_network import TemporalNetwork
+from .stream_ingestion import StreamIngestion
+from .run_report import RunReport
+from .profiling import Profiling
 
 
 class Datasources:
-    def __init__(self, input_path, output_path):
+    def __init__(self, input_path, output_path, reset_db=True, run_id=None):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.reset_db = reset_db
         self.files = Files(output_path)
-        self.database = Database(output_path)
-        self.contexts = Contexts(input_path)
         self.community_detection = CommunityDetection(input_path)
         self.context_detection = ContextDetection(input_path)
-        self.tw_api = TwApi(input_path, output_path)
+        self.context_expansion = ContextExpansion(input_path)
+        self.temporal_network = TemporalNetwork(input_path)
+        self.stream_ingestion = StreamIngestion(input_path)
+        self.run_report = RunReport(output_path, run_id)
+        self.profiling = Profiling(input_path, output_path)
+
+        # database, contexts, tw api, user ids and job queue are created at their first use
+        self.__datasources = {}
+        self.lock = threading.RLock()
+
+    def __get_datasource(self, datasource_name, datasource_factory):
+        with self.lock:
+            if datasource_name not in self.__datasources:
+                self.__datasources[datasource_name] = datasource_factory()
+
+        return self.__datasources[datasource_name]
+
+    @property
+    def database(self):
+        from .database.database import Database
+        return self.__get_datasource('database', lambda: Database(self.output_path, reset_db=self.reset_db))
+
+    @property
+    def contexts(self):
+        from .contexts import Contexts
+        return self.__get_datasource('contexts', lambda: Contexts(self.input_path))
+
+    @property
+    def tw_api(self):
+        from .tw_api import TwApi
+        return self.__get_datasource('tw_api', lambda: TwApi(self.input_path, self.output_path))
+
+    @property
+    def user_ids(self):
+        from .user_ids import UserIds
+        return self.__get_datasource('user_ids', lambda: UserIds(self.output_path))
+
+    @property
+    def job_queue(self):
+        from .job_queue import JobQueue
+        return self.__get_datasource('job_queue', lambda: JobQueue(self.output_path))
@@ -1,7 +1,9 @@
 import os
 import logging
+import uuid
 from cachetools import LRUCache
-from .model import file_models
+from .model import file_models, compression_extensions
+from datasources.run_report import counters
 
 logger = logging.getLogger(__name__)
 
@@ -21,29 +23,57 @@ class Files:
 
     def exists(self, pipeline_name, stage_name, file_name, file_extension, file_prefix='', file_suffix=''):
         full_file_name = self.__get_full_file_name(file_name, file_extension, file_prefix, file_suffix)
-        file_model = self.model[pipeline_name][stage_name][full_file_name]
-        file_exists = os.path.isfile(file_model['path'])
+        file_path, _ = self.__get_file_path(self.model[pipeline_name][stage_name][full_file_name])
+        file_exists = os.path.isfile(file_path)
         if file_exists:
-            logger.debug(f'file exists (file "{file_model["path"]}")')
+            counters.increment('artifact_hits')
+            logger.debug(f'file exists (file "{file_path}")')
         else:
-            logger.debug(f'file NOT exists (file "{file_model["path"]}")')
+            logger.debug(f'file NOT exists (file "{file_path}")')
 
         return file_exists
 
+    def stage_exists(self, pipeline_name, stage_name):
+        # all the files of a stage exist, not counted as artifact hits
+        stage_model = self.model.get(pipeline_name, {}).get(stage_name, {})
+
+        return bool(stage_model) and all(os.path.isfile(self.__get_file_path(f)[0]) for f in stage_model.values())
+
+    @staticmethod
+    def __get_file_path(file_model):
+        # path and compression of the file, an uncompressed file written before its model was compressed is used
+        # until the file is written again
+        if file_model['compression'] and not os.path.isfile(file_model['path']) and \
+                os.path.isfile(file_model['legacy_path']):
+            return file_model['legacy_path'], None
+
+        return file_model['path'], file_model['compression']
+
     def add_file_models(self, file_model_list):
         for file_model in file_model_list:
             self.add_file_model(**file_model)
 
     def add_file_model(self, pipeline_name, stage_name, file_name, file_extension,
-                       file_prefix='', file_suffix='', r_kwargs=None, w_kwargs=None):
+                       file_prefix='', file_suffix='', r_kwargs=None, w_kwargs=None, compression=None):
         path_dir = os.path.join(self.output_path, f'{pipeline_name}/{stage_name}')
         full_file_name = self.__get_full_file_name(file_name, file_extension, file_prefix, file_suffix)
 
+        # files are compressed with the compression of their model or "gzip"/"zstd" in TNA_COMPRESSION, models
+        # with compression False are never compressed
+        if compression is None:
+            compression = os.environ.get('TNA_COMPRESSION')
+        compression = compression or None
+        if compression and compression not in compression_extensions:
+            raise ValueError(f'error: unknown compression {compression}')
+
         new_file = {
             full_file_name: {
-                'path': os.path.join(path_dir, full_file_name),
+                'path': os.path.join(path_dir, full_file_name) +
+                (f'.{compression_extensions[compression]}' if compression else ''),
+                'legacy_path': os.path.join(path_dir, full_file_name),
                 'path_dir': path_dir,
                 'type': file_extension,
+                'compression': compression,
                 'r_kwargs': r_kwargs if r_kwargs else {},
                 'w_kwargs': w_kwargs if w_kwargs else {}
             }
@@ -64,24 +94,48 @@ class Files:
         try:
             file_model = self.model[pipeline_name][stage_name][full_file_name]
 
+            file_path, compression = self.__get_file_path(file_model)
+
             try:
-                m = self.cache[file_model['path']]
-                logger.debug(f'file read from cache (file "{file_model["path"]}")')
+                m = self.cache[file_path]
+                counters.increment('file_cache_hits')
+                logger.debug(f'file read from cache (file "{file_path}")')
                 return m.copy()
             except KeyError:
                 file_driver = file_models.get(file_model['type'])
 
                 if file_driver:
-                    file_content = file_driver.reader(file_model['path'], file_model['r_kwargs'])
+                    file_content = file_driver.reader(file_path, file_model['r_kwargs'], compression)
                 else:
                     raise KeyError('error: unknown file type')
 
-                logger.debug(f'file read (file "{file_model["path"]}")')
+                counters.increment('files_read')
+                counters.increment('bytes_read', os.path.getsize(file_path))
+                logger.debug(f'file read (file "{file_path}")')
 
                 return file_content
         except KeyError:
             return None
 
+    def read_chunks(self, pipeline_name, stage_name, file_name, file_extension, file_prefix='', file_suffix='',
+                    chunksize=100000):
+        # file content streamed in chunks of chunksize rows
+        full_file_name = self.__get_full_file_name(file_name, file_extension, file_prefix, file_suffix)
+        file_model = self.model[pipeline_name][stage_name][full_file_name]
+        file_driver = file_models.get(file_model['type'])
+
+        if not file_driver:
+            raise KeyError('error: unknown file type')
+        if not hasattr(file_driver, 'chunk_reader'):
+            raise TypeError(f'error: file type {file_model["type"]} can not be read in chunks')
+
+        file_path, compression = self.__get_file_path(file_model)
+        counters.increment('files_read')
+        counters.increment('bytes_read', os.path.getsize(file_path))
+        logger.debug(f'file read in chunks of {chunksize} (file "{file_path}")')
+
+        return file_driver.chunk_reader(file_path, file_model['r_kwargs'], compression, chunksize)
+
     def write(self, file_content,
               pipeline_name, stage_name, file_name, file_extension, file_prefix='', file_suffix=''):
         full_file_name = self.__get_full_file_name(file_name, file_extension, file_prefix, file_suffix)
@@ -92,10 +146,56 @@ class Files:
 
         file_driver = file_models.get(file_model['type'])
 
-        if file_driver:
-            file_preview = file_driver.writer(file_content, file_model['path'], file_model['w_kwargs'])
-        else:
+        if not file_driver:
             raise KeyError('error: unknown file type')
 
+        # the file is written next to its path and moved in place once complete, a job interrupted while writing
+        # does not leave a truncated artifact that exists for its next attempt
+        temp_path = os.path.join(file_model['path_dir'], f'.{uuid.uuid4().hex}.{os.path.basename(file_model["path"])}')
+        try:
+            file_preview = file_driver.writer(
+                file_content, temp_path, file_model['w_kwargs'], file_model['compression'])
+            os.replace(temp_path, file_model['path'])
+        finally:
+            if os.path.isfile(temp_path):
+                os.remove(temp_path)
+
+        if file_model['compression'] and os.path.isfile(file_model['legacy_path']):
+            os.remove(file_model['legacy_path'])
+
+        counters.increment('files_written')
+        counters.increment('bytes_written', os.path.getsize(file_model['path']))
         logger.debug(f'file written (file "{file_model["path"]}")\n' + str(file_preview))
         # self.cache[file_model['path']] = file_content
+
+    def append(self, file_content,
+               pipeline_name, stage_name, file_name, file_extension, file_prefix='', file_suffix=''):
+        full_file_name = self.__get_full_file_name(file_name, file_extension, file_prefix, file_suffix)
+        file_model = self.model[pipeline_name][stage_name][full_file_name]
+        file_path, compression = self.__get_file_path(file_model)
+        start_size = os.path.getsize(file_path)
+
+        file_driver = file_models.get(file_model['type'])
+
+        if not file_driver:
+            raise KeyError('error: unknown file type')
+        if not hasattr(file_driver, 'appender'):
+            raise TypeError(f'error: file type {file_model["type"]} can not be appended to')
+
+        file_preview = file_driver.appender(file_content, file_path, file_model['w_kwargs'], compression)
+        self.cache.pop(file_path, None)
+
+        counters.increment('files_written')
+        counters.increment('bytes_written', os.path.getsize(file_path) - start_size)
+        logger.debug(f'file appended (file "{file_path}")\n' + str(file_preview))
+
+    def remove_stage(self, pipeline_name, stage_name, file_prefix=''):
+        # files of the stage (with the prefix) are computed again at the next execution
+        for full_file_name, file_model in self.model.get(pipeline_name, {}).get(stage_name, {}).items():
+            if not full_file_name.startswith(f'{file_prefix}__' if file_prefix else ''):
+                continue
+            for file_path in {file_model['path'], file_model['legacy_path']}:
+                if os.path.isfile(file_path):
+                    os.remove(file_path)
+                    self.cache.pop(file_path, None)
+                    logger.debug(f'file removed (file "{file_path}")')
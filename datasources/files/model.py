@@ -1,17 +1,43 @@
+import io
 import json
-import networkx as nx
+import numpy as np
 import pandas as pd
 
+# file name suffix of each compression
+compression_extensions = {
+    'gzip': 'gz',
+    'zstd': 'zst'
+}
+
+
+def open_file(file_path, mode='r', compression=None):
+    # streams of compressed files, appends add a gzip member or zstd frame to the file
+    if compression is None:
+        return open(file_path, mode) if 'b' in mode else open(file_path, mode, encoding='utf-8')
+
+    if compression == 'gzip':
+        import gzip
+        stream = gzip.open(file_path, mode.replace('t', '') + 'b' if 'b' not in mode else mode, compresslevel=6)
+    elif compression == 'zstd':
+        import zstandard
+        raw_file = open(file_path, mode[0] + 'b')
+        stream = zstandard.ZstdDecompressor().stream_reader(raw_file, read_across_frames=True, closefd=True) \
+            if mode[0] == 'r' else zstandard.ZstdCompressor(level=3).stream_writer(raw_file, closefd=True)
+    else:
+        raise ValueError(f'error: unknown compression {compression}')
+
+    return stream if 'b' in mode else io.TextIOWrapper(stream, encoding='utf-8')
+
 
 class FileDriverBase:
     file_extension = ''
 
     @staticmethod
-    def writer(file_content, file_path, kwargs):
+    def writer(file_content, file_path, kwargs, compression=None):
         pass
 
     @staticmethod
-    def reader(file_path, kwargs):
+    def reader(file_path, kwargs, compression=None):
         pass
 
     @staticmethod
@@ -23,13 +49,31 @@ class PandasFileDriver(FileDriverBase):
     file_extension = 'csv'
 
     @staticmethod
-    def writer(df, file_path, kwargs):
-        df.to_csv(file_path, **kwargs)
+    def writer(df, file_path, kwargs, compression=None):
+        with open_file(file_path, 'w', compression) as csv_file:
+            df.to_csv(csv_file, **kwargs)
         return PandasFileDriver.__tostring(df, 5)
 
     @staticmethod
-    def reader(file_path, kwargs):
-        return pd.read_csv(file_path, **kwargs)
+    def reader(file_path, kwargs, compression=None):
+        with open_file(file_path, 'r', compression) as csv_file:
+            return pd.read_csv(csv_file, **kwargs)
+
+    @staticmethod
+    def chunk_reader(file_path, kwargs, compression=None, chunksize=None):
+        with open_file(file_path, 'r', compression) as csv_file:
+            yield from pd.read_csv(csv_file, chunksize=chunksize, **kwargs)
+
+    @staticmethod
+    def appender(df, file_path, kwargs, compression=None):
+        # rows are appended in the column order of the existing header
+        with open_file(file_path, 'r', compression) as csv_file:
+            columns = pd.read_csv(csv_file, nrows=0).columns
+        is_index = kwargs.get('index', True)
+        columns = columns[df.index.nlevels:] if is_index else columns
+        with open_file(file_path, 'a', compression) as csv_file:
+            df[columns].to_csv(csv_file, header=False, index=is_index)
+        return PandasFileDriver.__tostring(df, 5)
 
     @staticmethod
     def __tostring(df, rows=None):
@@ -41,14 +85,14 @@ class JsonFileDriver(FileDriverBase):
     file_extension = 'json'
 
     @staticmethod
-    def writer(json_content, file_path, kwargs):
-        with open(file_path, 'w') as json_file:
+    def writer(json_content, file_path, kwargs, compression=None):
+        with open_file(file_path, 'w', compression) as json_file:
             json.dump(json_content, json_file, **kwargs)
         return ''
 
     @staticmethod
-    def reader(file_path, kwargs):
-        with open(file_path) as json_file:
+    def reader(file_path, kwargs, compression=None):
+        with open_file(file_path, 'r', compression) as json_file:
             json_content = json.load(json_file, **kwargs)
         return json_content
 
@@ -57,13 +101,17 @@ class NetworkxFileDriver(FileDriverBase):
     file_extension = 'gexf'
 
     @staticmethod
-    def writer(graph, file_path, kwargs):
-        nx.write_gexf(graph, file_path, **kwargs)
+    def writer(graph, file_path, kwargs, compression=None):
+        import networkx as nx
+        with open_file(file_path, 'wb', compression) as gexf_file:
+            nx.write_gexf(graph, gexf_file, **kwargs)
         return NetworkxFileDriver.__tostring(graph, 5, 5)
 
     @staticmethod
-    def reader(file_path, kwargs):
-        graph = nx.read_gexf(file_path, **kwargs)
+    def reader(file_path, kwargs, compression=None):
+        import networkx as nx
+        with open_file(file_path, 'rb', compression) as gexf_file:
+            graph = nx.read_gexf(gexf_file, **kwargs)
         for n in graph.nodes(data=True):
             del n[1]['label']
 
@@ -82,8 +130,38 @@ class NetworkxFileDriver(FileDriverBase):
                f'{str(list(graph.edges(data=True))[:edges])}\n'
 
 
+class NumpyFileDriver(FileDriverBase):
+    file_extension = 'npz'
+
+    @staticmethod
+    def writer(arrays, file_path, kwargs, compression=None):
+        # the zip archive needs seeks, compressed archives are built in memory
+        if compression:
+            npz_buffer = io.BytesIO()
+            np.savez(npz_buffer, **arrays, **kwargs)
+            with open_file(file_path, 'wb', compression) as npz_file:
+                npz_file.write(npz_buffer.getbuffer())
+        else:
+            np.savez(file_path, **arrays, **kwargs)
+        return NumpyFileDriver.__tostring(arrays)
+
+    @staticmethod
+    def reader(file_path, kwargs, compression=None):
+        if compression:
+            with open_file(file_path, 'rb', compression) as npz_file:
+                file_path = io.BytesIO(npz_file.read())
+        with np.load(file_path, **kwargs) as npz_file:
+            arrays = {k: npz_file[k] for k in npz_file.files}
+        return arrays
+
+    @staticmethod
+    def __tostring(arrays):
+        return '  arrays: ' + ', '.join(f'{k} {v.dtype}{v.shape}' for k, v in arrays.items()) + '\n'
+
+
 file_models = {
     'csv': PandasFileDriver(),
     'json': JsonFileDriver(),
-    'gexf': NetworkxFileDriver()
+    'gexf': NetworkxFileDriver(),
+    'npz': NumpyFileDriver()
 }
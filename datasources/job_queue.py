@@ -0,0 +1,127 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    # (context, pipeline) jobs in a sqlite database of the shared output, a job is claimed once its dependencies
+    # are done; running jobs without a heartbeat for stale_timeout s are claimed again
+    heartbeat_interval = 30
+    stale_timeout = 120
+    max_attempts = 3
+
+    def __init__(self, output_path):
+        self.path_dir = os.path.join(output_path, 'job_queue')
+        self.path = os.path.join(self.path_dir, 'jobs.db')
+
+        if not os.path.exists(self.path_dir):
+            os.makedirs(self.path_dir)
+
+        with self.__transaction() as connection:
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS job (
+                    id INTEGER PRIMARY KEY,
+                    context_name TEXT,
+                    pipeline_name TEXT NOT NULL,
+                    depends_on TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker_name TEXT,
+                    start_time REAL,
+                    heartbeat_time REAL,
+                    end_time REAL,
+                    error TEXT
+                )''')
+
+    @contextmanager
+    def __transaction(self):
+        # write lock from the start, claims of concurrent workers are serialized
+        connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            yield connection
+            connection.execute('COMMIT')
+        except Exception:
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+            raise
+        finally:
+            connection.close()
+
+    def publish(self, jobs):
+        # jobs are dicts of context_name, pipeline_name and depends_on (positions of previous jobs), the
+        # previous jobs are replaced
+        with self.__transaction() as connection:
+            connection.execute('DELETE FROM job')
+            connection.executemany(
+                'INSERT INTO job (id, context_name, pipeline_name, depends_on, status) VALUES (?, ?, ?, ?, ?)',
+                [(i, j['context_name'], j['pipeline_name'], json.dumps(j['depends_on']), 'pending')
+                 for i, j in enumerate(jobs)])
+
+        logger.info(f'published {len(jobs)} jobs (file "{self.path}")')
+
+    def claim(self, worker_name):
+        # first pending job with its dependencies done
+        with self.__transaction() as connection:
+            self.__requeue_stale(connection)
+            done_ids = {r['id'] for r in connection.execute("SELECT id FROM job WHERE status = 'done'")}
+
+            for job in connection.execute("SELECT * FROM job WHERE status = 'pending' ORDER BY id").fetchall():
+                if done_ids.issuperset(json.loads(job['depends_on'])):
+                    now = time.time()
+                    connection.execute(
+                        "UPDATE job SET status = 'running', attempts = attempts + 1, worker_name = ?, "
+                        'start_time = ?, heartbeat_time = ?, end_time = NULL, error = NULL WHERE id = ?',
+                        (worker_name, now, now, job['id']))
+
+                    return dict(job, attempts=job['attempts'] + 1, worker_name=worker_name)
+
+        return None
+
+    def __requeue_stale(self, connection):
+        stale_time = time.time() - self.stale_timeout
+        for job in connection.execute("SELECT * FROM job WHERE status = 'running' AND heartbeat_time < ?",
+                                      (stale_time,)).fetchall():
+            is_failed = job['attempts'] >= self.max_attempts
+            logger.warning(f'job {job["id"]} of worker {job["worker_name"]} is stale, '
+                           f'{"failed" if is_failed else "pending again"}')
+            connection.execute('UPDATE job SET status = ?, error = ? WHERE id = ?',
+                               ('failed' if is_failed else 'pending', 'stale', job['id']))
+
+    def heartbeat(self, job):
+        # False if the attempt of the job is not running anymore, i.e. it was claimed again as stale
+        with self.__transaction() as connection:
+            return connection.execute(
+                "UPDATE job SET heartbeat_time = ? WHERE id = ? AND worker_name = ? AND attempts = ? "
+                "AND status = 'running'", (time.time(), job['id'], job['worker_name'], job['attempts'])).rowcount > 0
+
+    def complete(self, job, error=None):
+        # False if the attempt of the job is not running anymore, its outcome is not recorded
+        with self.__transaction() as connection:
+            return connection.execute(
+                "UPDATE job SET status = ?, end_time = ?, error = ? WHERE id = ? AND worker_name = ? AND attempts = ? "
+                "AND status = 'running'",
+                ('failed' if error else 'done', time.time(), error, job['id'], job['worker_name'],
+                 job['attempts'])).rowcount > 0
+
+    def cancel_pending(self):
+        # pending jobs can not run after a failure
+        with self.__transaction() as connection:
+            connection.execute("UPDATE job SET status = 'cancelled' WHERE status = 'pending'")
+
+    def get_status(self):
+        # number of jobs by status
+        with self.__transaction() as connection:
+            self.__requeue_stale(connection)
+            return {r['status']: r['no_jobs']
+                    for r in connection.execute('SELECT status, COUNT(*) AS no_jobs FROM job GROUP BY status')}
+
+    def get_jobs(self):
+        with self.__transaction() as connection:
+            return [dict(r) for r in connection.execute('SELECT * FROM job ORDER BY id')]
@@ -0,0 +1,62 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+
+logger = logging.getLogger(__name__)
+
+
+class Profiling:
+    # opt-in: profiling.json {"targets": [...], "top_n": 30} or TNA_PROFILE="pipeline_name,task_name,..."
+    def __init__(self, input_path, output_path):
+        self.input_path = os.path.join(input_path, 'profiling.json')
+        self.output_path = os.path.join(output_path, 'files')
+
+        config = self.get_config()
+        targets = config.get('targets', []) + os.environ.get('TNA_PROFILE', '').split(',')
+        self.targets = {self.__get_task_name(t.strip()) for t in targets if t.strip()}
+        self.top_n = int(os.environ.get('TNA_PROFILE_TOP_N', config.get('top_n', 30)))
+
+    def get_config(self):
+        if not os.path.isfile(self.input_path):
+            return {}
+
+        with open(self.input_path, 'r') as json_file:
+            profiling_settings = json.load(json_file)
+
+        return profiling_settings
+
+    @staticmethod
+    def __get_task_name(task_name):
+        # private task methods are selected without their leading underscores
+        return task_name.lstrip('_')
+
+    def is_enabled(self, pipeline_name, task_name):
+        return bool(self.targets) and \
+            (pipeline_name in self.targets or self.__get_task_name(task_name) in self.targets)
+
+    def run(self, task, pipeline_name, context_name=None):
+        # profile of the task thread, dumped next to the pipeline output files
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(task)
+        finally:
+            self.__write(profiler, pipeline_name, self.__get_task_name(task.__name__), context_name)
+
+    def __write(self, profiler, pipeline_name, task_name, context_name=None):
+        path_dir = os.path.join(self.output_path, pipeline_name, 'profiles')
+        if not os.path.exists(path_dir):
+            os.makedirs(path_dir, exist_ok=True)
+
+        file_prefix = context_name + '__' if context_name else ''
+        profile_path = os.path.join(path_dir, f'{file_prefix}{task_name}.prof')
+        profiler.dump_stats(profile_path)
+
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(self.top_n)
+        with open(os.path.join(path_dir, f'{file_prefix}{task_name}.txt'), 'w') as summary_file:
+            summary_file.write(summary.getvalue())
+
+        logger.info(f'task profile written (file "{profile_path}")')
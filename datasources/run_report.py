@@ -0,0 +1,57 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class Counters:
+    # counters of the task a thread works for, tasks running in parallel threads do not mix their counts and the
+    # helper threads of a task add to its counters through scope()
+    def __init__(self):
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def get_counters(self):
+        if not hasattr(self.local, 'counters'):
+            self.local.counters = {}
+        return self.local.counters
+
+    def increment(self, counter_name, value=1):
+        with self.lock:
+            task_counters = self.get_counters()
+            task_counters[counter_name] = task_counters.get(counter_name, 0) + value
+
+    @contextmanager
+    def scope(self, task_counters=None):
+        # counts of the current thread go to task_counters (new ones if not given) until the scope ends
+        previous_counters = getattr(self.local, 'counters', None)
+        self.local.counters = {} if task_counters is None else task_counters
+        try:
+            yield self.local.counters
+        finally:
+            self.local.counters = previous_counters if previous_counters is not None else {}
+
+
+counters = Counters()
+
+
+class RunReport:
+    def __init__(self, output_path, run_id=None):
+        self.output_path = os.path.join(output_path, 'reports')
+        # worker processes report under the run id of their parent
+        self.run_id = run_id or datetime.now().strftime('%Y%m%d%H%M%S')
+        self.lock = threading.Lock()
+
+    def add(self, pipeline_name, task_record, context_name=None):
+        # one json line per task in a report per context and pipeline
+        file_prefix = context_name + '__' if context_name else ''
+        report_path = os.path.join(self.output_path, f'{file_prefix}{pipeline_name}.jsonl')
+        record = {'run_id': self.run_id, 'context_name': context_name, 'pipeline_name': pipeline_name, **task_record}
+
+        with self.lock:
+            if not os.path.exists(self.output_path):
+                os.makedirs(self.output_path)
+
+            with open(report_path, 'a') as report_file:
+                report_file.write(json.dumps(record) + '\n')
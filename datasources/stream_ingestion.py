@@ -0,0 +1,25 @@
+import json
+import os
+
+
+class StreamIngestion:
+    def __init__(self, input_path):
+        self.input_path = os.path.join(input_path, 'stream_ingestion.json')
+
+    def get_config(self):
+        # micro-batches of batch_size tweets or batch_interval s, the network is refreshed every refresh_interval s
+        stream_ingestion_settings = {
+            'batch_size': 100,
+            'batch_interval': 5,
+            'refresh_interval': 60,
+            'queue_size': 10000,
+            'on_full': 'block',
+            'duration': None,
+            'max_no_tweets': None
+        }
+
+        if os.path.isfile(self.input_path):
+            with open(self.input_path, 'r') as json_file:
+                stream_ingestion_settings.update(json.load(json_file))
+
+        return stream_ingestion_settings
@@ -0,0 +1,20 @@
+import json
+import os
+
+
+class TemporalNetwork:
+    def __init__(self, input_path):
+        self.input_path = os.path.join(input_path, 'temporal_network.json')
+
+    def get_config(self):
+        # windows (pandas offsets, e.g. "1D" sliding by "1h") are not analyzed without settings
+        temporal_network_settings = {
+            'window': None,
+            'step': None
+        }
+
+        if os.path.isfile(self.input_path):
+            with open(self.input_path, 'r') as json_file:
+                temporal_network_settings.update(json.load(json_file))
+
+        return temporal_network_settings
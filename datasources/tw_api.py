@@ -1,13 +1,15 @@
+from concurrent.futures import ThreadPoolExecutor
 import json
 import os
 import re
 from datetime import datetime
 import pytz
-import requests_cache
-from TwitterAPI import TwitterAPI, TwitterPager, TwitterError
+from TwitterAPI import TwitterError
 import time
 import logging
 from tqdm import tqdm
+from datasources.run_report import counters
+from .tw_api_backends import LiveBackend, ReplayBackend
 
 logging.basicConfig(level=logging.DEBUG, format='%(levelname)s - %(name)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -21,16 +23,19 @@ class TwApi:
             os.makedirs(cache_path)
         self.cache_path = os.path.join(cache_path, 'cache')
 
-        # read tw api config
-        input_path = os.path.join(input_path, 'tw_api.json')
-        with open(input_path, 'r') as json_file:
-            tw_api_account = json.load(json_file)
-        self.api = TwitterAPI(
-            tw_api_account['consumer_key'], tw_api_account['consumer_key_secret'],
-            tw_api_account['access_token'], tw_api_account['access_token_secret'],
-            auth_type='oAuth2')
+        # read tw api config, the backend is "live" (default) or "replay" of recorded responses
+        with open(os.path.join(input_path, 'tw_api.json'), 'r') as json_file:
+            tw_api_config = json.load(json_file)
 
-        logger.debug('INIT Tw api')
+        if tw_api_config.get('backend', 'live') == 'replay':
+            replay_config = dict(tw_api_config.get('replay', {}))
+            replay_config['fixtures_path'] = os.path.join(input_path, replay_config.pop('path', 'tw_api_replay'))
+            self.backend = ReplayBackend(**replay_config)
+        else:
+            record_path = os.path.join(input_path, tw_api_config['record']) if 'record' in tw_api_config else None
+            self.backend = LiveBackend(tw_api_config, self.cache_path, record_path)
+
+        logger.debug(f'INIT Tw api ({tw_api_config.get("backend", "live")} backend)')
 
     @staticmethod
     def parse_user(raw_user):
@@ -103,12 +108,12 @@ class TwApi:
 
         return tw
 
-    def __get_tweets(self, pager, n, from_date=None, to_date=None, wait=5, parse=True):
+    def __get_tweets(self, iterator, n, from_date=None, to_date=None, parse=True):
         tw_list = []
 
         # with requests_cache.enabled(self.cache_path, expire_after=86400):
         try:
-            for i, raw_tw in zip(range(n), pager.get_iterator(wait=wait)):
+            for i, raw_tw in zip(range(n), iterator):
                 if 'message' in raw_tw:
                     logger.debug(f'{raw_tw["message"]} ({raw_tw["code"]})')
                 else:
@@ -139,54 +144,66 @@ class TwApi:
     def premium_search(self, product='fullarchive', label='prod', query='', since=None, until=None, n=100):
         logger.info(f'tw api search for: {query}')
 
-        pager = TwitterPager(self.api, f'tweets/search/{product}/:{label}',
-                             {'query': query,
-                              'fromDate': since.strftime('%Y%m%d%H%M'),
-                              'toDate': until.strftime('%Y%m%d%H%M')})
-
-        return self.__get_tweets(pager, n, parse=False)
+        return self.__get_tweets(self.backend.search(product, label, query, since, until), n, parse=False)
 
     # API limits: 200 results per page (for a maximum of 3200). App auth rate is 1500 req/15min.
     # https://developer.twitter.com/en/docs/tweets/timelines/api-reference/get-statuses-user_timeline
     def get_user_timeline(self, user_name, n=200, from_date=None, to_date=None):
         logger.info(f'tw api timeline for user: {user_name}')
 
-        pager = TwitterPager(self.api, 'statuses/user_timeline',
-                             {'screen_name': user_name,
-                              'count': n,
-                              'exclude_replies': 'true'})
-
-        return self.__get_tweets(pager, n, from_date, to_date, 2)
+        return self.__get_tweets(self.backend.user_timeline(user_name, n, wait=2), n, from_date, to_date)
 
-    def get_user_timelines(self, user_name_list, n, from_date=None, to_date=None):
-        logger.info(f'tw api timeline for {len(user_name_list)} users')
-        wait = 2
+    def get_user_timelines(self, user_name_list, n, from_date=None, to_date=None, max_workers=1, tweet_filter=None):
+        logger.info(f'tw api timeline for {len(user_name_list)} users ({max_workers} workers)')
+        # each worker pauses longer, the overall request rate does not change with the workers
+        wait = self.backend.pauses['user_timeline'] * max_workers
+        # api calls of the workers count for the calling task
+        task_counters = counters.get_counters()
 
-        stream = []
-        for u in tqdm(user_name_list):
+        def get_user_stream(user_name):
             start_time = time.time()
-            user_stream = self.get_user_timeline(u, n, from_date, to_date)
-            stream.extend(user_stream)
+            with counters.scope(task_counters):
+                user_stream = self.get_user_timeline(user_name, n, from_date, to_date)
+            # tweets are filtered as each timeline arrives
+            if tweet_filter:
+                user_stream = [tw for tw in user_stream if tweet_filter(tw)]
 
             elapsed = time.time() - start_time
             pause = wait - elapsed
             if pause > 0:
                 time.sleep(pause)
 
+            return user_stream
+
+        stream = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for user_stream in tqdm(executor.map(get_user_stream, user_name_list), total=len(user_name_list)):
+                stream.extend(user_stream)
+
         return stream
 
+    # https://developer.twitter.com/en/docs/tweets/filter-realtime/api-reference/post-statuses-filter
+    def filter_stream(self, track):
+        logger.info(f'tw api filtered stream for: {", ".join(track)}')
+
+        # keep alive, limit and disconnect messages are skipped
+        for raw_tw in self.backend.filter_stream(track):
+            if 'user' in raw_tw:
+                yield raw_tw
+            elif 'disconnect' in raw_tw or 'limit' in raw_tw:
+                logger.debug(f'stream message: {raw_tw}')
+
     # https://developer.twitter.com/en/docs/accounts-and-users/follow-search-get-users/api-reference/get-users-lookup
     def get_user_profiles(self, user_name_list):
         logger.info(f'tw api profiles for {len(user_name_list)} users')
         # group usernames in 100 lists
         u_groups = [user_name_list[n:n + 100] for n in range(0, len(user_name_list), 100)]
-        wait = 3
+        wait = self.backend.pauses['users_lookup']
 
         stream = []
         for u_list in u_groups:
             start_time = time.time()
-            with requests_cache.enabled(self.cache_path, expire_after=86400):
-                u_stream = self.api.request('users/lookup', {'screen_name': u_list, 'include_entities': 'false'})
+            u_stream = self.backend.users_lookup(u_list)
 
             for u in u_stream:
                 stream.append(self.parse_user(u))
@@ -200,6 +217,6 @@ class TwApi:
 
     # https://developer.twitter.com/en/docs/developer-utilities/rate-limit-status/api-reference/get-application-rate_limit_status
     def get_rate_limit_status(self, resources):
-        rate_limit_status = self.api.request('application/rate_limit_status', {'resources': resources}).json()
+        rate_limit_status = self.backend.rate_limit_status(resources)
 
         return rate_limit_status
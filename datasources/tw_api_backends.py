@@ -0,0 +1,219 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+import requests_cache
+from TwitterAPI import TwitterAPI, TwitterPager
+from datasources.run_report import counters
+
+logger = logging.getLogger(__name__)
+
+
+class CountingTwitterAPI(TwitterAPI):
+    # count requests, also the ones made by pagers for each page
+    def request(self, *args, **kwargs):
+        response = super(CountingTwitterAPI, self).request(*args, **kwargs)
+
+        counters.increment('api_calls')
+        if getattr(response.response, 'from_cache', False):
+            counters.increment('api_cache_hits')
+
+        return response
+
+
+class TwApiFixtures:
+    # recorded responses: search queries, user timelines (most recent tweets first) and user profiles
+    def __init__(self, fixtures_path):
+        self.fixtures_path = fixtures_path
+        self.lock = threading.Lock()
+
+    def __get_path(self, fixture_name):
+        return os.path.join(self.fixtures_path, f'{fixture_name}.jsonl')
+
+    def read(self, fixture_name):
+        fixture_path = self.__get_path(fixture_name)
+        if not os.path.isfile(fixture_path):
+            return []
+
+        with open(fixture_path) as fixture_file:
+            return [json.loads(line) for line in fixture_file]
+
+    def append(self, fixture_name, records):
+        with self.lock:
+            if not os.path.exists(self.fixtures_path):
+                os.makedirs(self.fixtures_path)
+
+            with open(self.__get_path(fixture_name), 'a') as fixture_file:
+                for record in records:
+                    fixture_file.write(json.dumps(record) + '\n')
+
+
+class LiveBackend:
+    # client side pauses (s) between timelines and between profile lookups
+    pauses = {'user_timeline': 2, 'users_lookup': 3}
+
+    def __init__(self, tw_api_account, cache_path, record_path=None):
+        self.tw_api_account = tw_api_account
+        self.cache_path = cache_path
+        self.fixtures = TwApiFixtures(record_path) if record_path else None
+        self.__api = None
+        self.lock = threading.Lock()
+
+    @property
+    def api(self):
+        # the client is created at the first request, cached artifacts never need it
+        with self.lock:
+            if self.__api is None:
+                self.__api = CountingTwitterAPI(
+                    self.tw_api_account['consumer_key'], self.tw_api_account['consumer_key_secret'],
+                    self.tw_api_account['access_token'], self.tw_api_account['access_token_secret'],
+                    auth_type='oAuth2')
+                logger.debug('INIT Tw api client')
+
+        return self.__api
+
+    def __record(self, fixture_name, key_name, key, iterator):
+        # the consumed tweets are recorded also when the client stops early
+        tweets = []
+        try:
+            for raw_tw in iterator:
+                if 'message' not in raw_tw:
+                    tweets.append(raw_tw)
+                yield raw_tw
+        finally:
+            self.fixtures.append(fixture_name, [{key_name: key, 'tweets': tweets}])
+
+    def search(self, product, label, query, since, until, wait=5):
+        pager = TwitterPager(self.api, f'tweets/search/{product}/:{label}',
+                             {'query': query,
+                              'fromDate': since.strftime('%Y%m%d%H%M'),
+                              'toDate': until.strftime('%Y%m%d%H%M')})
+        iterator = pager.get_iterator(wait=wait)
+
+        return self.__record('search', 'query', query, iterator) if self.fixtures else iterator
+
+    def user_timeline(self, user_name, n, wait=2):
+        pager = TwitterPager(self.api, 'statuses/user_timeline',
+                             {'screen_name': user_name,
+                              'count': n,
+                              'exclude_replies': 'true'})
+        iterator = pager.get_iterator(wait=wait)
+
+        return self.__record('timelines', 'screen_name', user_name, iterator) if self.fixtures else iterator
+
+    def users_lookup(self, user_name_list):
+        with requests_cache.enabled(self.cache_path, expire_after=86400):
+            raw_users = list(self.api.request('users/lookup', {'screen_name': user_name_list,
+                                                               'include_entities': 'false'}))
+        if self.fixtures:
+            self.fixtures.append('users', raw_users)
+
+        return raw_users
+
+    def filter_stream(self, track):
+        # the filtered stream needs user auth, it has its own client
+        stream_api = CountingTwitterAPI(
+            self.tw_api_account['consumer_key'], self.tw_api_account['consumer_key_secret'],
+            self.tw_api_account['access_token'], self.tw_api_account['access_token_secret'])
+        iterator = stream_api.request('statuses/filter', {'track': ','.join(track)}).get_iterator()
+
+        return self.__record_stream(iterator) if self.fixtures else iterator
+
+    def __record_stream(self, iterator):
+        for raw_tw in iterator:
+            if 'user' in raw_tw:
+                self.fixtures.append('stream', [raw_tw])
+            yield raw_tw
+
+    def rate_limit_status(self, resources):
+        return self.api.request('application/rate_limit_status', {'resources': resources}).json()
+
+
+class ReplayBackend:
+    # recorded responses with simulated latency and rate limit windows, no client side pauses
+    pauses = {'user_timeline': 0, 'users_lookup': 0}
+    page_sizes = {'search': 100, 'user_timeline': 200, 'users_lookup': 100}
+
+    # app auth limits: requests per window (s)
+    default_rate_limits = {
+        'search': {'requests': 60, 'window': 60},
+        'user_timeline': {'requests': 1500, 'window': 900},
+        'users_lookup': {'requests': 300, 'window': 900}
+    }
+
+    def __init__(self, fixtures_path, latency=.2, rate_limits=None, time_scale=1., seed=0, stream_rate=50.):
+        self.fixtures = TwApiFixtures(fixtures_path)
+        fixtures = self.fixtures
+        self.searches = {r['query']: r['tweets'] for r in fixtures.read('search')}
+        self.timelines = {r['screen_name'].lower(): r['tweets'] for r in fixtures.read('timelines')}
+        self.users = {u['screen_name'].lower(): u for u in fixtures.read('users')}
+
+        self.latency = latency
+        self.rate_limits = dict(self.default_rate_limits, **(rate_limits if rate_limits else {}))
+        self.time_scale = time_scale
+        self.stream_rate = stream_rate
+        self.random = random.Random(seed)
+        self.windows = {}
+        self.lock = threading.Lock()
+
+        logger.debug(f'INIT Tw api replay ({len(self.searches)} searches, {len(self.timelines)} timelines, '
+                     f'{len(self.users)} users)')
+
+    def __request(self, endpoint):
+        # a request beyond the window limit gets a 429, the client waits for the window reset
+        with self.lock:
+            now = time.time()
+            rate_limit = self.rate_limits[endpoint]
+            window_start, no_requests = self.windows.get(endpoint, (now, 0))
+            if now - window_start >= rate_limit['window'] * self.time_scale:
+                window_start, no_requests = now, 0
+
+            reset_in = 0
+            if no_requests >= rate_limit['requests']:
+                reset_in = window_start + rate_limit['window'] * self.time_scale - now
+                window_start, no_requests = window_start + rate_limit['window'] * self.time_scale, 0
+            self.windows[endpoint] = (window_start, no_requests + 1)
+            latency = self.random.lognormvariate(0, .5) * self.latency * self.time_scale
+
+        if reset_in > 0:
+            counters.increment('api_rate_limited')
+            logger.debug(f'Rate limit exceeded (429) for {endpoint}, reset in {round(reset_in, 2)} s')
+            time.sleep(reset_in)
+
+        counters.increment('api_calls')
+        time.sleep(latency)
+
+    def __pages(self, endpoint, items):
+        page_size = self.page_sizes[endpoint]
+        for page_start in range(0, max(len(items), 1), page_size):
+            self.__request(endpoint)
+            yield from items[page_start:page_start + page_size]
+
+    def search(self, product, label, query, since, until, wait=5):
+        if query not in self.searches:
+            logger.debug(f'no recorded search for: {query}')
+
+        return self.__pages('search', self.searches.get(query, []))
+
+    def user_timeline(self, user_name, n, wait=2):
+        return self.__pages('user_timeline', self.timelines.get(user_name.lower(), [])[:n])
+
+    def users_lookup(self, user_name_list):
+        self.__request('users_lookup')
+
+        return [self.users[u.lower()] for u in user_name_list if u.lower() in self.users]
+
+    def filter_stream(self, track):
+        # recorded stream tweets matching any tracked term, at stream_rate tweets per second
+        track = [t.lower() for t in track]
+        for raw_tw in self.fixtures.read('stream'):
+            text = (raw_tw['extended_tweet']['full_text'] if 'extended_tweet' in raw_tw else raw_tw['text']).lower()
+            if any(t in text for t in track):
+                if self.stream_rate:
+                    time.sleep(self.time_scale / self.stream_rate)
+                yield raw_tw
+
+    def rate_limit_status(self, resources):
+        return {'resources': {}}
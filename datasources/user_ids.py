@@ -0,0 +1,71 @@
+import fcntl
+import os
+import logging
+import threading
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class UserIds:
+    # user names are stored as fixed width records, the id of a user is its record number
+    user_name_dtype = np.dtype('S20')
+
+    def __init__(self, output_path):
+        self.path_dir = os.path.join(output_path, 'user_ids')
+        self.path = os.path.join(self.path_dir, 'user_names.bin')
+        self.lock = threading.Lock()
+        self.__index = None
+
+        if not os.path.exists(self.path_dir):
+            os.makedirs(self.path_dir)
+
+    def __load(self):
+        # memory map the user names and index them, reloaded when other processes appended users
+        size = os.path.getsize(self.path) if os.path.isfile(self.path) else 0
+        no_user_names = size // self.user_name_dtype.itemsize
+
+        if self.__index is None or len(self.__index) != no_user_names:
+            user_names = np.memmap(self.path, dtype=self.user_name_dtype, mode='r', shape=(no_user_names,)) \
+                if no_user_names else np.empty(0, dtype=self.user_name_dtype)
+            self.__index = pd.Index(user_names)
+            logger.debug(f'loaded {no_user_names} user ids (file "{self.path}")')
+
+        return self.__index
+
+    def find_ids(self, user_names):
+        # ids of the known user names and -1 for the others, no user name is appended
+        user_names = pd.Series(user_names, dtype=object).str.encode('utf-8')
+
+        with self.lock:
+            return self.__load().get_indexer(user_names)
+
+    def get_ids(self, user_names):
+        # ids of the user names, new user names are appended in order of first appearance
+        user_names = pd.Series(user_names, dtype=object).str.encode('utf-8')
+        if (user_names.str.len() > self.user_name_dtype.itemsize).any():
+            raise ValueError(f'user names longer than {self.user_name_dtype.itemsize} bytes')
+
+        with self.lock:
+            ids = self.__load().get_indexer(user_names)
+
+            if (ids == -1).any():
+                # other processes append under the same file lock
+                with open(self.path, 'ab') as user_names_file:
+                    fcntl.flock(user_names_file, fcntl.LOCK_EX)
+                    index = self.__load()
+                    new_user_names = user_names[index.get_indexer(user_names) == -1].drop_duplicates()
+                    user_names_file.write(new_user_names.to_numpy(dtype=self.user_name_dtype).tobytes())
+                    user_names_file.flush()
+                logger.debug(f'added {len(new_user_names)} user ids (file "{self.path}")')
+
+                ids = self.__load().get_indexer(user_names)
+
+        return ids.astype('uint32')
+
+    def get_user_names(self, ids):
+        with self.lock:
+            index = self.__load()
+
+        return pd.Series(index.take(np.asarray(ids, dtype='int64'))).str.decode('utf-8').to_numpy()
@@ -0,0 +1,162 @@
+import logging
+import queue
+import threading
+import time
+from pipelines.phase_1 import ContextUpdate
+
+logger = logging.getLogger(__name__)
+
+
+class StreamIngestion:
+    # the filtered stream of a context is consumed in micro-batches appended to the context, a refresh updates
+    # the network artifacts with the appended tweets
+    def __init__(self, datasources, context_name):
+        self.datasources = datasources
+        self.context_name = context_name
+        self.config = datasources.stream_ingestion.get_config()
+        if self.config['on_full'] not in ['block', 'drop']:
+            raise ValueError(f'on_full is "block" or "drop", not "{self.config["on_full"]}"')
+
+        self.hashtags = set(datasources.contexts.get_context(context_name)['hashtags'].iat[0])
+        self.context_update = ContextUpdate(datasources, context_name)
+        self.queue = queue.Queue(maxsize=self.config['queue_size'])
+        self.stop_event = threading.Event()
+        self.error = None
+        self.stats = {'received': 0, 'dropped': 0, 'off_topic': 0, 'appended': 0, 'refreshes': 0}
+
+    def execute(self):
+        logger.info(f'START STREAM INGESTION {self.context_name} ({", ".join(sorted(self.hashtags))})')
+        start_time = time.time()
+
+        producer = threading.Thread(target=self.__produce, name=f'stream_{self.context_name}', daemon=True)
+        consumer = threading.Thread(target=self.__consume, name=f'ingestion_{self.context_name}')
+        producer.start()
+        consumer.start()
+
+        try:
+            while consumer.is_alive():
+                consumer.join(timeout=1)
+                if self.config['duration'] and time.time() - start_time >= self.config['duration']:
+                    self.stop_event.set()
+        except KeyboardInterrupt:
+            logger.info('stream ingestion interrupted')
+            self.stop_event.set()
+            consumer.join()
+
+        logger.info(f'END STREAM INGESTION {self.context_name} '
+                    f'({", ".join(f"{k}: {v}" for k, v in self.stats.items())})')
+        if self.error:
+            raise self.error
+
+        return self.stats
+
+    def __produce(self):
+        # a full queue blocks the stream (backpressure) or drops the new tweets
+        try:
+            for raw_tw in self.datasources.tw_api.filter_stream(sorted(self.hashtags)):
+                if self.stop_event.is_set():
+                    break
+                self.stats['received'] += 1
+
+                if self.config['on_full'] == 'drop':
+                    try:
+                        self.queue.put_nowait(raw_tw)
+                    except queue.Full:
+                        self.stats['dropped'] += 1
+                        if self.stats['dropped'] % 1000 == 1:
+                            logger.warning(f'queue full, {self.stats["dropped"]} tweets dropped')
+                else:
+                    while not self.stop_event.is_set():
+                        try:
+                            self.queue.put(raw_tw, timeout=1)
+                            break
+                        except queue.Full:
+                            pass
+
+                if self.config['max_no_tweets'] and self.stats['received'] >= self.config['max_no_tweets']:
+                    break
+        except Exception as e:
+            # the tweets received before are still appended, the error is raised by execute
+            logger.exception('ERROR stream')
+            self.error = e
+            self.stop_event.set()
+        finally:
+            # end of the stream, not needed once the ingestion is stopped
+            while not self.stop_event.is_set():
+                try:
+                    self.queue.put(None, timeout=1)
+                    break
+                except queue.Full:
+                    pass
+
+    def __consume(self):
+        # an error stops the stream, it is raised by execute
+        try:
+            self.__consume_batches()
+        except Exception as e:
+            logger.exception('ERROR stream ingestion')
+            self.error = e
+            self.stop_event.set()
+
+    def __consume_batches(self):
+        last_refresh = time.time()
+        is_appended = False
+        is_ended = False
+
+        while not is_ended:
+            batch, is_ended = self.__get_batch()
+            if batch:
+                is_appended |= self.__append(batch)
+
+            if is_appended and (is_ended or self.stop_event.is_set() or
+                                time.time() - last_refresh >= self.config['refresh_interval']):
+                self.__refresh()
+                last_refresh = time.time()
+                is_appended = False
+
+            is_ended |= self.stop_event.is_set() and self.queue.empty()
+
+    def __get_batch(self):
+        # up to batch_size tweets, waiting at most batch_interval s
+        batch = []
+        deadline = time.time() + self.config['batch_interval']
+
+        while len(batch) < self.config['batch_size']:
+            try:
+                raw_tw = self.queue.get(timeout=max(deadline - time.time(), 0))
+            except queue.Empty:
+                break
+            if raw_tw is None:
+                return batch, True
+            batch.append(raw_tw)
+
+        return batch, False
+
+    def __append(self, batch):
+        # tweets of the context hashtags are added to the tweets to append at the next refresh
+        raw_tweets = [raw_tw for raw_tw in batch
+                      if self.hashtags.intersection(self.__get_hashtags(self.datasources.tw_api.parse_tweet(raw_tw)))]
+        self.stats['off_topic'] += len(batch) - len(raw_tweets)
+
+        if raw_tweets:
+            stream_append = self.datasources.files.read(
+                'context_update', 'append_stream', 'stream_append', 'json', self.context_name) \
+                if self.datasources.files.exists(
+                    'context_update', 'append_stream', 'stream_append', 'json', self.context_name) else []
+            self.datasources.files.write(
+                stream_append + raw_tweets, 'context_update', 'append_stream', 'stream_append', 'json',
+                self.context_name)
+            self.stats['appended'] += len(raw_tweets)
+
+        logger.debug(f'batch of {len(batch)} tweets, {len(raw_tweets)} appended, {self.queue.qsize()} queued')
+
+        return len(raw_tweets) > 0
+
+    def __refresh(self):
+        logger.info(f'refresh context {self.context_name} ({self.stats["appended"]} tweets appended)')
+        self.context_update.execute()
+        self.stats['refreshes'] += 1
+
+    @staticmethod
+    def __get_hashtags(tw):
+        return tw['hashtags'] + tw['retweeted_hashtags']
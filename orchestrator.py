@@ -1,10 +1,14 @@
 import os
 import logging
+import signal
+import socket
+import threading
 import time
 from datasources import Datasources
-from pipelines.phase_1 import ContextHarvesting, NetworkCreation, NetworkMetrics, CommunityDetection, \
-    CommunityDetectionMetrics, ProfileMetrics, UserContextMetrics, Persistence
+from pipelines.phase_1 import ContextHarvesting, NetworkCreation, NetworkMetrics, TemporalNetwork, CommunityDetection, \
+    CommunityDetectionMetrics, ProfileMetrics, UserContextMetrics, Persistence, ContextUpdate
 from pipelines.phase_2 import Ranking, UserTimelines, ContextDetector, BipartiteGraph, BipartiteCommunityDetection
+from ingestion import StreamIngestion
 
 logging.basicConfig(level=logging.DEBUG, filename='logs/debug.log',
                     format='%(asctime)s - %(levelname)s - %(name)s - %(message)s')
@@ -12,14 +16,18 @@ logger = logging.getLogger(__name__)
 
 
 class Orchestrator:
-    def __init__(self, project_name, input_path, output_path):
+    phase_1_pipelines = [ContextHarvesting, NetworkCreation, NetworkMetrics, TemporalNetwork, CommunityDetection,
+                         CommunityDetectionMetrics, ProfileMetrics, UserContextMetrics, Persistence, ContextUpdate]
+    phase_2_pipelines = [Ranking, UserTimelines, BipartiteGraph, BipartiteCommunityDetection, ContextDetector]
+
+    def __init__(self, project_name, input_path, output_path, reset_db=True):
         if not os.path.isdir(os.path.join(input_path, project_name)):
             raise FileNotFoundError(f'project {project_name} doesn\'t exist')
 
         self.project_name = project_name
         self.project_input_path = os.path.join(input_path, project_name)
         self.project_output_path = os.path.join(output_path, project_name)
-        self.datasources = Datasources(self.project_input_path, self.project_output_path)
+        self.datasources = Datasources(self.project_input_path, self.project_output_path, reset_db=reset_db)
 
         logger.info('INIT Orchestrator')
 
@@ -27,18 +35,144 @@ class Orchestrator:
         start_time = time.time()
         logger.info('START Orchestrator')
 
-        pipeline_1 = [ContextHarvesting, NetworkCreation, NetworkMetrics, CommunityDetection, CommunityDetectionMetrics,
-                      ProfileMetrics, UserContextMetrics, Persistence]
         for context_name in self.datasources.contexts.get_context_names():
             logger.info(f'EXEC pipeline for {context_name}')
-            for p in pipeline_1:
+            for p in self.phase_1_pipelines:
                 current_pipeline = p(self.datasources, context_name)
                 current_pipeline.execute()
 
-        pipeline_2 = [Ranking, UserTimelines, BipartiteGraph, BipartiteCommunityDetection, ContextDetector]
-        for p in pipeline_2:
+        for p in self.phase_2_pipelines:
             current_pipeline = p(self.datasources)
             current_pipeline.execute()
 
         logger.info('END Orchestrator')
         logger.debug(f'elapsed time: {round(time.time() - start_time, 4)} s')
+
+    def stream(self, context_name):
+        # the context is harvested and analyzed first, then its stream is ingested until stopped
+        start_time = time.time()
+        logger.info(f'START Orchestrator stream for {context_name}')
+
+        for p in self.phase_1_pipelines:
+            current_pipeline = p(self.datasources, context_name)
+            current_pipeline.execute()
+
+        StreamIngestion(self.datasources, context_name).execute()
+
+        logger.info('END Orchestrator stream')
+        logger.debug(f'elapsed time: {round(time.time() - start_time, 4)} s')
+
+    def get_jobs(self):
+        # pipelines of a context run in order, phase 2 starts once every context is done
+        jobs = []
+        phase_1_ends = []
+        for context_name in self.datasources.contexts.get_context_names():
+            for i, p in enumerate(self.phase_1_pipelines):
+                jobs.append({'context_name': context_name, 'pipeline_name': p.__name__,
+                             'depends_on': [len(jobs) - 1] if i else []})
+            phase_1_ends.append(len(jobs) - 1)
+
+        for i, p in enumerate(self.phase_2_pipelines):
+            jobs.append({'context_name': None, 'pipeline_name': p.__name__,
+                         'depends_on': [len(jobs) - 1] if i else phase_1_ends})
+
+        return jobs
+
+    def coordinate(self, poll_interval=5):
+        # jobs are published to the queue of the shared output and executed by workers
+        start_time = time.time()
+        logger.info('START Orchestrator coordinator')
+
+        # the database is reset before any worker uses it
+        self.datasources.database.reset()
+        logger.debug(f'reset database {self.datasources.database.output_db_path}')
+        job_queue = self.datasources.job_queue
+        job_queue.publish(self.get_jobs())
+
+        status = None
+        while True:
+            new_status = job_queue.get_status()
+            if new_status != status:
+                status = new_status
+                logger.info(f'jobs: {", ".join(f"{k} {v}" for k, v in sorted(status.items()))}')
+
+            if status.get('failed'):
+                job_queue.cancel_pending()
+                failed_jobs = [j for j in job_queue.get_jobs() if j['status'] == 'failed']
+                raise RuntimeError('failed jobs: ' + ', '.join(
+                    f'{j["pipeline_name"]} {j["context_name"] or ""} ({j["worker_name"]}: {j["error"]})'
+                    for j in failed_jobs))
+            if set(status) == {'done'}:
+                break
+
+            time.sleep(poll_interval)
+
+        logger.info('END Orchestrator coordinator')
+        logger.debug(f'elapsed time: {round(time.time() - start_time, 4)} s')
+
+    def get_job_pipeline(self, pipeline_name, context_name=None):
+        # the pipelines before the one of the job only add the file models of the artifacts it reads, as the worker
+        # may not have executed them
+        if context_name:
+            pipelines = [(p, (context_name,)) for p in self.phase_1_pipelines]
+        else:
+            pipelines = [(p, (c,)) for c in self.datasources.contexts.get_context_names()
+                         for p in self.phase_1_pipelines] + [(p, ()) for p in self.phase_2_pipelines]
+
+        for p, pipeline_args in pipelines:
+            if p.__name__ == pipeline_name:
+                return p(self.datasources, *pipeline_args)
+            p(self.datasources, *pipeline_args)
+
+        raise ValueError(f'unknown pipeline {pipeline_name}')
+
+    def work(self, worker_name=None, poll_interval=5):
+        # jobs are claimed until none is left pending, the complete artifacts of interrupted jobs are reused by their
+        # next attempt
+        worker_name = worker_name or f'{socket.gethostname()}-{os.getpid()}'
+        job_queue = self.datasources.job_queue
+        logger.info(f'START Orchestrator worker {worker_name}')
+
+        while True:
+            job = job_queue.claim(worker_name)
+            if job is None:
+                status = job_queue.get_status()
+                # workers started before the coordinator wait for its jobs
+                if status and not status.get('pending') and not status.get('running'):
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            logger.info(f'EXEC job {job["id"]} {job["pipeline_name"]} {job["context_name"] or ""} '
+                        f'(attempt {job["attempts"]})')
+            is_executed = threading.Event()
+            is_stale = threading.Event()
+
+            def heartbeat():
+                while not is_executed.wait(job_queue.heartbeat_interval):
+                    if not job_queue.heartbeat(job):
+                        # another worker executes the job on the same artifacts, this one stops
+                        is_stale.set()
+                        if not is_executed.is_set():
+                            signal.pthread_kill(threading.main_thread().ident, signal.SIGINT)
+                        break
+
+            heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+            heartbeat_thread.start()
+            try:
+                self.get_job_pipeline(job['pipeline_name'], job['context_name']).execute()
+                error = None
+            except KeyboardInterrupt:
+                if not is_stale.is_set():
+                    raise
+            except Exception as e:
+                logger.exception(f'ERROR job {job["id"]}')
+                error = f'{type(e).__name__}: {e}'
+            finally:
+                is_executed.set()
+                heartbeat_thread.join()
+
+            if is_stale.is_set() or not job_queue.complete(job, error):
+                raise RuntimeError(f'job {job["id"]} was claimed again by another worker, worker {worker_name} stopped')
+
+        logger.info(f'END Orchestrator worker {worker_name}')
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from pipelines.ragged_array import RaggedArray
+
+
+class CoOccurrence:
+    def __init__(self, tweets):
+        self.tweets = tweets.reset_index(drop=True)
+        self.no_tweets = len(self.tweets.index)
+
+    @staticmethod
+    def flatten(list_series):
+        # flat values of a list column (lists or their csv strings) with the positional row of each value
+        ragged = RaggedArray.from_series(list_series)
+
+        return ragged.rows, ragged.values
+
+    @staticmethod
+    def encode(values):
+        # integer codes follow the lexicographic order of the values
+        codes, uniques = pd.factorize(values, sort=True)
+
+        return codes.astype(np.int64), np.asarray(uniques, dtype=object)
+
+    @staticmethod
+    def incidence(rows, cols, shape):
+        return sp.coo_matrix((np.ones(rows.size, dtype=np.int64), (rows, cols)), shape=shape).tocsr()
+
+    @staticmethod
+    def to_edges(matrix, uniques_from, uniques_to, columns):
+        matrix = matrix.tocoo()
+        edges = pd.DataFrame({'from': matrix.row, 'to': matrix.col, 'weight': matrix.data})
+        edges = edges[edges['weight'] > 0].sort_values(by=['from', 'to']).reset_index(drop=True)
+
+        edges['from'] = uniques_from[edges['from'].values]
+        edges['to'] = uniques_to[edges['to'].values]
+
+        return edges.rename(columns=dict(zip(['from', 'to', 'weight'], columns)))
+
+    def user_network(self):
+        # undirected user-user weights: 1 if a single direction of mention exists, 2 if both
+        columns = ['from_username', 'to_username', 'weight']
+        rows, mentions = self.flatten(self.tweets['mentions'])
+        if not mentions.size:
+            return pd.DataFrame(columns=columns)
+
+        authors = self.tweets['user_name'].values[rows]
+        codes, uniques = self.encode(np.concatenate([authors, mentions]))
+        no_users = uniques.size
+
+        mentions_matrix = self.incidence(codes[:rows.size], codes[rows.size:], (no_users, no_users))
+        mentions_matrix.data[:] = 1
+
+        users_network = sp.triu(mentions_matrix + mentions_matrix.T, k=1) + \
+            sp.diags(mentions_matrix.diagonal(), dtype=np.int64, format='csr')
+
+        return self.to_edges(users_network, uniques, uniques, columns)
+
+    def hashtag_network(self):
+        # hashtag-hashtag weights: number of co-occurring hashtag pairs in the same tweet
+        columns = ['from_hashtag', 'to_hashtag', 'weight']
+        hashtags = RaggedArray.from_series(self.tweets['hashtags'])
+        if not hashtags.codes.size:
+            return pd.DataFrame(columns=columns)
+
+        uniques = hashtags.uniques
+        cooccurrence = hashtags.cooccurrence()
+
+        # repeated hashtags in a tweet pair with themselves n * (n - 1) / 2 times, the diagonal sums n * n
+        self_pairs = (cooccurrence.diagonal() - np.bincount(hashtags.codes, minlength=uniques.size)) // 2
+
+        hashtags_network = sp.triu(cooccurrence, k=1) + \
+            sp.diags(self_pairs, dtype=np.int64, format='csr')
+
+        return self.to_edges(hashtags_network, uniques, uniques, columns)
+
+    def user_hashtag_network(self):
+        # user-hashtag weights: number of times a user used a hashtag
+        columns = ['user_name', 'hashtag', 'weight']
+        hashtags = RaggedArray.from_series(self.tweets['hashtags'])
+        if not hashtags.codes.size:
+            return pd.DataFrame(columns=columns)
+
+        user_codes, user_uniques = self.encode(self.tweets['user_name'].values)
+        tweets_users = self.incidence(np.arange(self.no_tweets, dtype=np.int64), user_codes,
+                                      (self.no_tweets, user_uniques.size))
+
+        return self.to_edges(tweets_users.T @ hashtags.incidence(), user_uniques, hashtags.uniques, columns)
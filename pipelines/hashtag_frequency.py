@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from pipelines.cooccurrence import CoOccurrence
+
+
+class HashtagFrequency:
+    def __init__(self, matrix, hashtags, start_date):
+        # (hashtag x day) sparse matrix, days are offsets from start_date
+        self.matrix = matrix.tocsr()
+        self.matrix.sort_indices()
+        self.hashtags = np.asarray(hashtags, dtype=object)
+        self.start_date = np.datetime64(start_date, 'D')
+
+    @staticmethod
+    def from_tweets(tweets):
+        # daily number of tweets using each hashtag
+        rows, hashtags = CoOccurrence.flatten(tweets['hashtags'])
+        dates = pd.to_datetime(tweets['date']).values.astype('datetime64[D]')[rows]
+        start_date = dates.min()
+        days = (dates - start_date).astype(np.int64)
+        codes, hashtags = CoOccurrence.encode(hashtags)
+
+        matrix = sp.coo_matrix((np.ones(days.size, dtype=np.int64), (codes, days)),
+                               shape=(hashtags.size, days.max() + 1))
+
+        return HashtagFrequency(matrix, hashtags, start_date)
+
+    @staticmethod
+    def day_counts(tweets):
+        # daily number of tweets using each hashtag as a frame, counts of different tweets are summed
+        rows, hashtags = CoOccurrence.flatten(tweets['hashtags'])
+        dates = pd.to_datetime(tweets['date']).values.astype('datetime64[D]')[rows]
+
+        return pd.DataFrame({'hashtag': hashtags, 'date': dates}) \
+            .groupby(['hashtag', 'date']).size().reset_index(name='count')
+
+    @staticmethod
+    def from_day_counts(counts):
+        dates = counts['date'].values.astype('datetime64[D]')
+        start_date = dates.min()
+        days = (dates - start_date).astype(np.int64)
+        codes, hashtags = CoOccurrence.encode(counts['hashtag'].values)
+
+        matrix = sp.coo_matrix((counts['count'].values.astype(np.int64), (codes, days)),
+                               shape=(hashtags.size, days.max() + 1))
+
+        return HashtagFrequency(matrix, hashtags, start_date)
+
+    @staticmethod
+    def from_arrays(arrays):
+        matrix = sp.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']), shape=tuple(arrays['shape']))
+
+        return HashtagFrequency(matrix, arrays['hashtags'].astype(object), arrays['start_date'])
+
+    def to_arrays(self):
+        return {
+            'data': self.matrix.data,
+            'indices': self.matrix.indices,
+            'indptr': self.matrix.indptr,
+            'shape': np.array(self.matrix.shape),
+            'hashtags': self.hashtags.astype(str),
+            'start_date': self.start_date
+        }
+
+    def zscore(self):
+        # z-score of the daily counts, retaining only values greater than 0
+        matrix = self.matrix.astype(np.float64)
+        matrix.data = (matrix.data - matrix.data.mean()) / matrix.data.std()
+        matrix.data[matrix.data <= 0] = 0
+        matrix.eliminate_zeros()
+
+        return HashtagFrequency(matrix, self.hashtags, self.start_date)
+
+    def to_frame(self):
+        matrix = self.matrix.tocoo()
+
+        return pd.DataFrame({
+            'hashtag': self.hashtags[matrix.row],
+            'date': pd.to_datetime(self.start_date + matrix.col),
+            'count': matrix.data
+        })
+
+    def timeline(self, hashtag):
+        # zero-filled daily series between the first and the last day the hashtag is used
+        index = np.searchsorted(self.hashtags, hashtag)
+        if index == self.hashtags.size or self.hashtags[index] != hashtag:
+            raise KeyError(f'hashtag {hashtag} doesn\'t exist')
+
+        row = self.matrix[index]
+        days = np.arange(row.indices.min(), row.indices.max() + 1)
+        counts = np.zeros(days.size, dtype=row.dtype)
+        counts[row.indices - days[0]] = row.data
+
+        return pd.Series(counts, index=pd.to_datetime(self.start_date + days), name='count')
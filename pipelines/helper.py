@@ -1,2 +1,18 @@
+import numpy as np
+import pandas as pd
+
+
 def str_to_list(s):
     return [] if s == '[]' else s.strip('[]').replace('\'', '').split(', ')
+
+
+def get_edges(source_ids, target_ids, weights=None):
+    # weights summed by (source_id, target_id) packed in integer keys, edges sorted by source and target
+    edge_codes, edge_keys = pd.factorize((np.asarray(source_ids, dtype='uint64') << np.uint64(32)) |
+                                         np.asarray(target_ids, dtype='uint64'), sort=True)
+
+    return pd.DataFrame({
+        'source_id': (edge_keys >> np.uint64(32)).astype('uint32'),
+        'target_id': (edge_keys & np.uint64(0xffffffff)).astype('uint32'),
+        'weight': np.bincount(edge_codes, weights=weights, minlength=len(edge_keys)).astype('int64')
+    })
@@ -0,0 +1,90 @@
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import pandas as pd
+
+
+class PartitionedAggregation:
+    # partial aggregates of chunks are spilled to disk in partitions by the hash of their key columns, then each
+    # partition is reduced in memory on its own
+    def __init__(self, key_columns, spill_path, no_partitions=64):
+        self.key_columns = key_columns
+        self.no_partitions = no_partitions
+
+        if not os.path.exists(spill_path):
+            os.makedirs(spill_path)
+        self.path_dir = tempfile.mkdtemp(dir=spill_path)
+        self.empty_df = None
+
+    def __get_path(self, partition):
+        return os.path.join(self.path_dir, f'partition_{partition}.pkl')
+
+    def append(self, df):
+        if self.empty_df is None:
+            self.empty_df = df.iloc[:0]
+
+        partitions = pd.util.hash_pandas_object(df[self.key_columns], index=False).to_numpy() % self.no_partitions
+        for partition, partition_df in df.groupby(partitions, sort=False):
+            with open(self.__get_path(partition), 'ab') as partition_file:
+                pickle.dump(partition_df, partition_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def __read(self, partition):
+        partition_dfs = []
+        with open(self.__get_path(partition), 'rb') as partition_file:
+            while True:
+                try:
+                    partition_dfs.append(pickle.load(partition_file))
+                except EOFError:
+                    break
+
+        return pd.concat(partition_dfs)
+
+    def reduce(self, reduce_partition):
+        # reduced partitions in order of their key columns
+        reduced_dfs = [reduce_partition(self.__read(p)) for p in range(self.no_partitions)
+                       if os.path.isfile(self.__get_path(p))] or [reduce_partition(self.empty_df)]
+
+        return pd.concat(reduced_dfs).sort_values(by=self.key_columns).reset_index(drop=True)
+
+    def remove(self):
+        shutil.rmtree(self.path_dir, ignore_errors=True)
+
+    @staticmethod
+    def memory_usage(df, no_sample_rows=1000):
+        # deep memory usage, with the values of list cells, estimated on the first rows
+        sample = df.head(no_sample_rows)
+        sample_size = sample.memory_usage(deep=True).sum() + \
+            sum(sys.getsizeof(v) for c in sample.columns[sample.dtypes == object]
+                for cell in sample[c] if isinstance(cell, list) for v in cell)
+
+        return sample_size * len(df) / len(sample) if len(sample) else sample_size
+
+    @staticmethod
+    def aggregate(chunks, memory_budget, in_memory, map_chunk, reduce_partition, key_columns, spill_path,
+                  no_partitions=64):
+        # chunks are kept in memory up to a quarter of the budget (in memory aggregations take a multiple of their
+        # input), over it the chunks are mapped to partial aggregates and spilled
+        chunk_list = []
+        chunks_size = 0
+        for chunk in chunks:
+            chunk_list.append(chunk)
+            chunks_size += PartitionedAggregation.memory_usage(chunk)
+            if chunks_size > memory_budget / 4:
+                break
+        else:
+            return in_memory(pd.concat(chunk_list))
+
+        # spilled partitions are removed also when reading or aggregating the chunks fails
+        partitioned_aggregation = PartitionedAggregation(key_columns, spill_path, no_partitions)
+        try:
+            for chunk in chunk_list:
+                partitioned_aggregation.append(map_chunk(chunk))
+            del chunk_list
+            for chunk in chunks:
+                partitioned_aggregation.append(map_chunk(chunk))
+
+            return partitioned_aggregation.reduce(reduce_partition)
+        finally:
+            partitioned_aggregation.remove()
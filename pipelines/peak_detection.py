@@ -0,0 +1,90 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+
+class PeakDetection:
+    def __init__(self, frequency, tolerance=1, height_quantile=.9, shard_size=10000, max_workers=None):
+        # frequency is a HashtagFrequency holding only the positive daily values, peak values are float32
+        self.frequency = frequency.matrix.astype(np.float32)
+        self.hashtags = frequency.hashtags
+        self.start_date = frequency.start_date
+        self.tolerance = tolerance
+        self.height_quantile = height_quantile
+        self.shard_size = shard_size
+        self.max_workers = max_workers
+
+    def find_peaks(self):
+        shards = [(s, min(s + self.shard_size, self.frequency.shape[0]))
+                  for s in range(0, self.frequency.shape[0], self.shard_size)]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            peaks = [p for p in executor.map(self.__find_shard_peaks, shards) if p is not None]
+
+        columns = ['hashtag', 'peak_value', 'peak_date', 'peak_width', 'start_date', 'end_date']
+        if not peaks:
+            return pd.DataFrame(columns=columns)
+
+        peaks = pd.concat(peaks, ignore_index=True)
+        for c in ['peak_date', 'start_date', 'end_date']:
+            peaks[c] = pd.to_datetime(self.start_date + peaks[c].values).date
+
+        return peaks[columns]
+
+    def __find_shard_peaks(self, shard):
+        shard_start, shard_end = shard
+        frequency = self.frequency[shard_start:shard_end]
+
+        rows = np.repeat(np.arange(shard_start, shard_end), np.diff(frequency.indptr))
+        cols = frequency.indices.astype(np.int64)
+        values = frequency.data
+        no_values = values.size
+        if not no_values:
+            return None
+
+        # the first and last positive value of each row delimit the hashtag timeline
+        is_first = np.r_[True, rows[1:] != rows[:-1]]
+        is_last = np.r_[rows[1:] != rows[:-1], True]
+        gaps = np.r_[0, np.diff(cols)] - 1
+        is_adjacent = ~is_first & (gaps == 0)
+
+        # plateaus are runs of equal values on consecutive days
+        run_starts = np.flatnonzero(is_first | ~is_adjacent | (values != np.r_[np.nan, values[:-1]]))
+        run_ends = np.r_[run_starts[1:] - 1, no_values - 1]
+        run_values = values[run_starts]
+
+        left_values = np.where(is_adjacent[run_starts], values[run_starts - 1], 0)
+        right_values = np.where(np.r_[is_adjacent[1:], False][run_ends],
+                                values[np.minimum(run_ends + 1, no_values - 1)], 0)
+
+        # local maxima as in scipy.signal.find_peaks, timeline edges are never peaks
+        heights = pd.Series(values.astype(np.float64)).groupby(rows).quantile(self.height_quantile)
+        is_peak = ~is_first[run_starts] & ~is_last[run_ends] & \
+            (left_values < run_values) & (right_values < run_values) & \
+            (run_values >= heights.reindex(rows[run_starts]).values)
+        peaks = (run_starts[is_peak] + run_ends[is_peak]) // 2
+
+        # peak bounds extend over positive values separated by gaps of at most tolerance days
+        segment_starts = np.flatnonzero(is_first | (gaps > self.tolerance))
+        segment_ends = np.r_[segment_starts[1:] - 1, no_values - 1]
+        segment_ids = np.cumsum(is_first | (gaps > self.tolerance)) - 1
+        positions = np.arange(no_values)
+        row_first_cols = cols[np.maximum.accumulate(np.where(is_first, positions, 0))]
+        row_last_cols = cols[np.minimum.accumulate(np.where(is_last, positions, no_values)[::-1])[::-1]]
+
+        peak_cols = cols[peaks]
+        start_cols = cols[segment_starts][segment_ids[peaks]]
+        end_cols = cols[segment_ends][segment_ids[peaks]]
+
+        # the bound walk does not move when the peak is next to the timeline edges
+        start_cols = np.where(peak_cols - row_first_cols[peaks] == 1, peak_cols, start_cols)
+        end_cols = np.where(row_last_cols[peaks] - peak_cols == 1, peak_cols, end_cols)
+
+        return pd.DataFrame({
+            'hashtag': self.hashtags[rows[peaks]],
+            'peak_value': values[peaks],
+            'peak_date': peak_cols,
+            'peak_width': end_cols - start_cols + 1,
+            'start_date': start_cols,
+            'end_date': end_cols
+        })
@@ -1,11 +1,13 @@
 from .context_harvesting import ContextHarvesting
 from .network_creation import NetworkCreation
 from .network_metrics import NetworkMetrics
+from .temporal_network import TemporalNetwork
 from .community_detection import CommunityDetection
 from .community_detection_metrics import CommunityDetectionMetrics
 from .profile_metrics import ProfileMetrics
 from .usercontext_metrics import UserContextMetrics
 from .persistence import Persistence
+from .context_update import ContextUpdate
 
-__all__ = ['ContextHarvesting', 'NetworkCreation', 'NetworkMetrics', 'CommunityDetection', 'CommunityDetectionMetrics',
-           'ProfileMetrics', 'UserContextMetrics', 'Persistence']
+__all__ = ['ContextHarvesting', 'NetworkCreation', 'NetworkMetrics', 'TemporalNetwork', 'CommunityDetection',
+           'CommunityDetectionMetrics', 'ProfileMetrics', 'UserContextMetrics', 'Persistence', 'ContextUpdate']
@@ -1,5 +1,4 @@
 import logging
-import networkx as nx
 import pandas as pd
 from pipelines.pipeline_base import PipelineBase
 
@@ -24,6 +23,21 @@ class CommunityDetection(PipelineBase):
                     'index': False
                 }
             },
+            {
+                'stage_name': 'warm_start',
+                'file_name': 'previous_communities',
+                'file_extension': 'csv',
+                'file_prefix': context_name,
+                'r_kwargs': {
+                    'dtype': {
+                        'community': 'uint16',
+                        'user_id': 'uint32'
+                    }
+                },
+                'w_kwargs': {
+                    'index': False
+                }
+            },
             {
                 'stage_name': 'add_communities_to_nodes',
                 'file_name': 'nodes',
@@ -93,7 +107,7 @@ class CommunityDetection(PipelineBase):
 
                 return pd.DataFrame(c)
 
-            def infomap_alg(g):
+            def infomap_alg(g, initial_partition=None):
                 import infomap
 
                 im = infomap.Infomap('--two-level --directed --silent')
@@ -102,7 +116,11 @@ class CommunityDetection(PipelineBase):
                 for e in g.edges(data=True):
                     im.addLink(e[0], e[1], e[2]['weight'])
 
-                im.run()
+                # warm start from the communities found before the context was updated
+                if initial_partition:
+                    im.run(initial_partition=initial_partition)
+                else:
+                    im.run()
 
                 c = pd.DataFrame([{'user_id': n.physicalId, 'community': n.moduleIndex()}
                                   for n in im.iterLeafNodes()])
@@ -130,7 +148,15 @@ class CommunityDetection(PipelineBase):
 
             logger.info(f'find communities with algorithm: {cd_config["name"]}')
 
-            communities = alg(graph, **cd_config['kwargs'])
+            alg_kwargs = dict(cd_config['kwargs'])
+            if cd_config['name'] == 'infomap' and self.datasources.files.exists(
+                    'community_detection', 'warm_start', 'previous_communities', 'csv', self.context_name):
+                previous_communities = self.datasources.files.read(
+                    'community_detection', 'warm_start', 'previous_communities', 'csv', self.context_name)
+                alg_kwargs['initial_partition'] = dict(zip(previous_communities['user_id'].tolist(),
+                                                           previous_communities['community'].tolist()))
+
+            communities = alg(graph, **alg_kwargs)
 
             # if empty (no communities have been found), assign all nodes to the same community
             if communities.empty:
@@ -138,6 +164,8 @@ class CommunityDetection(PipelineBase):
 
             self.datasources.files.write(
                 communities, 'community_detection', 'find_communities', 'communities', 'csv', self.context_name)
+            # the warm start is used once, a later detection starts from scratch
+            self.datasources.files.remove_stage('community_detection', 'warm_start', self.context_name)
 
     def __add_communities_to_nodes(self):
         if not self.datasources.files.exists(
@@ -158,6 +186,7 @@ class CommunityDetection(PipelineBase):
     def __add_communities_to_graph(self):
         if not self.datasources.files.exists(
                 'community_detection', 'add_communities_to_graph', 'graph', 'gexf', self.context_name):
+            import networkx as nx
             graph = self.datasources.files.read(
                 'network_creation', 'create_graph', 'graph', 'gexf', self.context_name)
             nodes = self.datasources.files.read(
@@ -1,13 +1,14 @@
 import logging
-import networkx as nx
 import pandas as pd
-import pquality.PartitionQuality as Pq
-from pipelines.pipeline_base import PipelineBase
+from pipelines.pipeline_base import PipelineBase, cpu_bound
+from .community_detection import CommunityDetection
 
 logger = logging.getLogger(__name__)
 
 
 class CommunityDetectionMetrics(PipelineBase):
+    input_pipelines = [CommunityDetection]
+
     def __init__(self, datasources, context_name):
         files = [
             {
@@ -72,9 +73,11 @@ class CommunityDetectionMetrics(PipelineBase):
         super(CommunityDetectionMetrics, self) \
             .__init__('community_detection_metrics', files, tasks, datasources)
 
+    @cpu_bound
     def __pquality(self):
         if not self.datasources.files.exists(
                 'community_detection_metrics', 'pquality', 'pquality', 'csv', self.context_name):
+            import pquality.PartitionQuality as Pq
             graph = self.datasources.files.read(
                 'community_detection', 'add_communities_to_graph', 'graph', 'gexf', self.context_name)
             nodes = self.datasources.files.read(
@@ -108,6 +111,7 @@ class CommunityDetectionMetrics(PipelineBase):
             self.datasources.files.write(
                 pquality_df, 'community_detection_metrics', 'pquality', 'pquality', 'csv', self.context_name)
 
+    @cpu_bound
     def __partition_summary(self):
         def graph_summary(graph):
             # NaN assortatitvity: https://groups.google.com/forum/#!topic/networkx-discuss/o2zl40LMmqM
@@ -133,6 +137,7 @@ class CommunityDetectionMetrics(PipelineBase):
 
         if not self.datasources.files.exists(
                 'community_detection_metrics', 'partition_summary', 'partition_summary', 'csv', self.context_name):
+            import networkx as nx
             graph = self.datasources.files.read(
                 'community_detection', 'add_communities_to_graph', 'graph', 'gexf', self.context_name)
             nodes = self.datasources.files.read(
@@ -153,9 +158,11 @@ class CommunityDetectionMetrics(PipelineBase):
                 partition_summary_df, 'community_detection_metrics', 'partition_summary', 'partition_summary',
                 'csv', self.context_name)
 
+    @cpu_bound
     def __node_metrics(self):
         if not self.datasources.files.exists(
                 'community_detection_metrics', 'node_metrics', 'nodes', 'csv', self.context_name):
+            import networkx as nx
             graph = self.datasources.files.read(
                 'community_detection', 'add_communities_to_graph', 'graph', 'gexf', self.context_name)
             nodes = self.datasources.files.read(
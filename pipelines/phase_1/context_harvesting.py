@@ -1,4 +1,6 @@
+from collections import Counter
 from datetime import datetime
+from itertools import chain
 import logging
 import pandas as pd
 from pipelines.helper import str_to_list
@@ -9,6 +11,29 @@ logger = logging.getLogger(__name__)
 
 class ContextHarvesting(PipelineBase):
     def __init__(self, datasources, context_name):
+        stream_r_kwargs = {
+            'dtype': {
+                'tw_id': int,
+                'user_name': str,
+                'date': str,
+                'text': str,
+                'lang': str,
+                'reply': str,
+                'no_likes': 'uint32',
+                'no_retweets': 'uint32',
+                'no_replies': 'uint32',
+                'is_retweet': bool,
+                'is_media': bool
+            },
+            'converters': {
+                'hashtags': str_to_list,
+                'urls': str_to_list,
+                'mentions': str_to_list,
+                'retweeted_hashtags': str_to_list
+            },
+            'parse_dates': ['date'],
+            'date_parser': lambda x: datetime.strptime(x, '%Y-%m-%d %H:%M:%S')
+        }
         files = [
             {
                 'stage_name': 'create_context',
@@ -34,42 +59,35 @@ class ContextHarvesting(PipelineBase):
                 'stage_name': 'harvest_context',
                 'file_name': 'stream',
                 'file_extension': 'json',
-                'file_prefix': context_name
+                'file_prefix': context_name,
+                # raw tweets are the largest artifact
+                'compression': 'gzip'
             },
             {
                 'stage_name': 'harvest_context',
                 'file_name': 'stream_expanded',
                 'file_extension': 'csv',
                 'file_prefix': context_name,
-                'r_kwargs': {
-                    'dtype': {
-                        'tw_id': int,
-                        'user_name': str,
-                        'date': str,
-                        'text': str,
-                        'lang': str,
-                        'reply': str,
-                        'no_likes': 'uint32',
-                        'no_retweets': 'uint32',
-                        'no_replies': 'uint32',
-                        'is_retweet': bool,
-                        'is_media': bool
-
-                    },
-                    'converters': {
-                        'hashtags': str_to_list,
-                        'urls': str_to_list,
-                        'mentions': str_to_list,
-                        'retweeted_hashtags': str_to_list
-                    },
-                    'parse_dates': ['date'],
-                    'date_parser': lambda x: datetime.strptime(x, '%Y-%m-%d %H:%M:%S')
-                },
+                'r_kwargs': stream_r_kwargs,
                 'w_kwargs': {
                     'index': False
                 }
             }
         ]
+        # tweets of each expansion round are checkpointed
+        self.expansion_config = datasources.context_expansion.get_config()
+        files += [
+            {
+                'stage_name': 'expand_context',
+                'file_name': f'expansion_{i}',
+                'file_extension': 'csv',
+                'file_prefix': context_name,
+                'r_kwargs': stream_r_kwargs,
+                'w_kwargs': {
+                    'index': False
+                }
+            } for i in range(1, self.expansion_config['no_expansions'] + 1)
+        ]
         tasks = [self.__create_context, self.__harvest_context, self.__expand_context]
         self.context_name = context_name
         super(ContextHarvesting, self).__init__('context_harvesting', files, tasks, datasources)
@@ -101,34 +119,62 @@ class ContextHarvesting(PipelineBase):
                 'context_harvesting', 'harvest_context', 'stream', 'json', self.context_name)
             context = self.datasources.contexts.get_context(self.context_name)
             context_record = context.to_dict('records')[0]
+            hashtags = set(context_record['hashtags'])
 
             # parse harvested tweets from the premium tw api
             tw_df = pd.DataFrame.from_records([self.datasources.tw_api.parse_tweet(raw_tw) for raw_tw in stream])
-            users = list(set(tw_df['user_name'].tolist() + tw_df['mentions'].sum()))
 
-            number_of_expansions = 0
-            for i in range(number_of_expansions):
-                # harvest new tweets
-                tw_df_expansion = pd.DataFrame.from_records(self.datasources.tw_api.get_user_timelines(
-                    users, n=3200, from_date=context_record['start_date'], to_date=context_record['end_date']))
-
-                # filter harvested tweets wrt hashtags
-                if not tw_df_expansion.empty:
-                    tw_df_expansion = tw_df_expansion[
-                        tw_df_expansion['hashtags']
-                            .apply(lambda t: any(h in context_record['hashtags'] for h in t)) |
-                        tw_df_expansion['retweeted_hashtags']
-                            .apply(lambda t: any(h in context_record['hashtags'] for h in t))]
-
-                # merge results
-                tw_df = pd.concat([tw_df, tw_df_expansion])
-
-                logger.debug(f'expansion {i}: harvested {tw_df_expansion.shape[0]} new tweets from {len(users)} users')
+            # snowball expansion: each round harvests the timelines of the users mentioned by the tweets
+            # of the previous round and not harvested yet, most mentioned first
+            tw_dfs = [tw_df]
+            visited_users = set()
+            frontier = self.__get_frontier(tw_df, visited_users, tw_df['user_name'])
+            api_budget = self.expansion_config['api_budget']
+            max_users_per_round = self.expansion_config['max_users_per_round']
+
+            for i in range(1, self.expansion_config['no_expansions'] + 1):
+                if max_users_per_round is not None:
+                    frontier = frontier[:max_users_per_round]
+                if api_budget is not None:
+                    frontier = frontier[:api_budget]
+                if not frontier:
+                    break
+
+                if self.datasources.files.exists(
+                        'context_harvesting', 'expand_context', f'expansion_{i}', 'csv', self.context_name):
+                    tw_df_expansion = self.datasources.files.read(
+                        'context_harvesting', 'expand_context', f'expansion_{i}', 'csv', self.context_name)
+                else:
+                    # off topic tweets are dropped as they are harvested
+                    tw_df_expansion = pd.DataFrame.from_records(self.datasources.tw_api.get_user_timelines(
+                        frontier, n=self.expansion_config['max_no_tweets'],
+                        from_date=context_record['start_date'], to_date=context_record['end_date'],
+                        max_workers=self.expansion_config['max_workers'],
+                        tweet_filter=lambda tw: any(h in hashtags for h in tw['hashtags']) or
+                        any(h in hashtags for h in tw['retweeted_hashtags'])), columns=tw_df.columns)
+
+                    self.datasources.files.write(tw_df_expansion, 'context_harvesting', 'expand_context',
+                                                 f'expansion_{i}', 'csv', self.context_name)
+
+                logger.debug(f'expansion {i}: harvested {tw_df_expansion.shape[0]} new tweets '
+                             f'from {len(frontier)} users')
+
+                tw_dfs.append(tw_df_expansion)
+                visited_users.update(frontier)
+                if api_budget is not None:
+                    api_budget -= len(frontier)
 
                 # get new users to harvest
-                users = list(set(tw_df['mentions'].sum()) - set(tw_df['user_name'].tolist()))
+                frontier = self.__get_frontier(tw_df_expansion, visited_users)
 
-            tw_df = tw_df.drop_duplicates(subset=['tw_id']).sort_values(by=['user_name', 'date'])
+            tw_df = pd.concat(tw_dfs).drop_duplicates(subset=['tw_id']).sort_values(by=['user_name', 'date'])
 
             self.datasources.files.write(
                 tw_df, 'context_harvesting', 'harvest_context', 'stream_expanded', 'csv', self.context_name)
+
+    @staticmethod
+    def __get_frontier(tw_df, visited_users, user_names=()):
+        # not visited users by number of mentions, ties by user name
+        user_counts = Counter(chain(user_names, chain.from_iterable(tw_df['mentions'])))
+
+        return [u for u, _ in sorted(user_counts.items(), key=lambda c: (-c[1], c[0])) if u not in visited_users]
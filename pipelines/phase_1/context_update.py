@@ -0,0 +1,219 @@
+import logging
+import numpy as np
+import pandas as pd
+from pipelines.helper import get_edges
+from pipelines.pipeline_base import PipelineBase
+from .context_harvesting import ContextHarvesting
+from .network_creation import NetworkCreation
+from .network_metrics import NetworkMetrics
+from .temporal_network import TemporalNetwork
+from .community_detection import CommunityDetection
+from .community_detection_metrics import CommunityDetectionMetrics
+from .profile_metrics import ProfileMetrics
+from .usercontext_metrics import UserContextMetrics
+from .persistence import Persistence
+
+logger = logging.getLogger(__name__)
+
+
+class ContextUpdate(PipelineBase):
+    def __init__(self, datasources, context_name):
+        files = [
+            {
+                'stage_name': 'append_stream',
+                'file_name': 'stream_append',
+                'file_extension': 'json',
+                'file_prefix': context_name,
+                # tweets are dropped into the file by other processes at a fixed path
+                'compression': False
+            },
+            {
+                'stage_name': 'update_communities',
+                'file_name': 'drift',
+                'file_extension': 'json',
+                'file_prefix': context_name
+            }
+        ]
+        tasks = [self.__append_stream, self.__update_network, self.__update_metrics, self.__update_communities]
+        self.context_name = context_name
+        self.__delta = None
+        self.__delta_edges = None
+        self.__edges = None
+
+        # updated artifacts belong to the other pipelines, the ones downstream of the network are executed again
+        ContextHarvesting(datasources, context_name)
+        NetworkCreation(datasources, context_name)
+        self.pipelines = [p(datasources, context_name) for p in [NetworkMetrics, TemporalNetwork, CommunityDetection,
+                                                                 CommunityDetectionMetrics, ProfileMetrics,
+                                                                 UserContextMetrics, Persistence]]
+        super(ContextUpdate, self).__init__('context_update', files, tasks, datasources)
+
+    def __append_stream(self):
+        self.__delta = None
+        if self.datasources.files.exists(
+                'context_update', 'append_stream', 'stream_append', 'json', self.context_name):
+            stream = self.datasources.files.read(
+                'context_update', 'append_stream', 'stream_append', 'json', self.context_name)
+            stream_expanded = self.datasources.files.read(
+                'context_harvesting', 'harvest_context', 'stream_expanded', 'csv', self.context_name)
+
+            # only tweets not in the context yet
+            tw_df = pd.DataFrame.from_records([self.datasources.tw_api.parse_tweet(raw_tw) for raw_tw in stream])
+            if not tw_df.empty:
+                tw_df = tw_df[~tw_df['tw_id'].isin(stream_expanded['tw_id'])].drop_duplicates(subset=['tw_id']) \
+                    .sort_values(by=['user_name', 'date'])
+
+            logger.info(f'append {tw_df.shape[0]} new tweets to context {self.context_name}')
+
+            if not tw_df.empty:
+                self.datasources.files.append(
+                    tw_df, 'context_harvesting', 'harvest_context', 'stream_expanded', 'csv', self.context_name)
+                self.__delta = tw_df
+
+            self.datasources.files.remove_stage('context_update', 'append_stream', self.context_name)
+
+    def __update_network(self):
+        if self.__delta is not None:
+            import networkx as nx
+            network = self.__delta[['user_name', 'mentions']].explode('mentions').dropna() \
+                .rename(columns={'user_name': 'from_username', 'mentions': 'to_username'})
+
+            codes, user_names = pd.factorize(np.concatenate([network.from_username.to_numpy(),
+                                                             network.to_username.to_numpy()]))
+            user_ids = self.datasources.user_ids.get_ids(user_names)
+            self.__delta_edges = get_edges(user_ids[codes[:len(network)]], user_ids[codes[len(network):]])
+
+            # add new nodes
+            nodes = self.datasources.files.read(
+                'network_creation', 'create_nodes', 'nodes', 'csv', self.context_name)
+            delta_nodes = pd.DataFrame({'user_name': user_names}, index=pd.Index(user_ids, name='user_id'))
+            nodes = pd.concat([nodes, delta_nodes[~delta_nodes.index.isin(nodes.index)]]).sort_index()
+
+            # sum delta weights to the stored ones
+            edges = self.datasources.files.read(
+                'network_creation', 'create_edges', 'edges', 'csv', self.context_name)
+            self.__edges = get_edges(np.concatenate([edges.source_id, self.__delta_edges.source_id]),
+                                     np.concatenate([edges.target_id, self.__delta_edges.target_id]),
+                                     np.concatenate([edges.weight, self.__delta_edges.weight]))
+
+            graph = self.datasources.files.read(
+                'network_creation', 'create_graph', 'graph', 'gexf', self.context_name)
+            for source_id, target_id, weight in self.__delta_edges.itertuples(index=False):
+                if graph.has_edge(source_id, target_id):
+                    graph[source_id][target_id]['weight'] += int(weight)
+                else:
+                    graph.add_edge(int(source_id), int(target_id), weight=int(weight))
+            nx.set_node_attributes(graph, delta_nodes['user_name'].to_dict(), 'user_name')
+
+            logger.info(f'update network with {len(self.__delta_edges)} edges, '
+                        f'{len(self.__edges) - len(edges)} of them new')
+
+            self.datasources.files.append(
+                network, 'network_creation', 'create_network', 'network', 'csv', self.context_name)
+            self.datasources.files.write(
+                nodes, 'network_creation', 'create_nodes', 'nodes', 'csv', self.context_name)
+            self.datasources.files.write(
+                self.__edges, 'network_creation', 'create_edges', 'edges', 'csv', self.context_name)
+            self.datasources.files.write(
+                graph, 'network_creation', 'create_graph', 'graph', 'gexf', self.context_name)
+
+    def __update_metrics(self):
+        if self.__delta is not None:
+            # degree distribution of the updated edges, the graph summary and the windows are computed again
+            degrees = pd.concat([self.__edges.source_id, self.__edges.target_id]).value_counts()
+            degree_counts = degrees.value_counts().sort_index()
+            cumsum_deg_dist_df = pd.DataFrame(
+                {'cumsum_of_the_no_of_nodes': degree_counts[::-1].cumsum()[::-1].to_numpy() / len(degrees)},
+                index=pd.Index(degree_counts.index, name='degree'))
+
+            self.datasources.files.write(
+                cumsum_deg_dist_df, 'network_metrics', 'cumsum_deg_dist', 'cumsum_deg_dist', 'csv', self.context_name)
+            self.datasources.files.remove_stage('network_metrics', 'graph_summary', self.context_name)
+            self.datasources.files.remove_stage('temporal_network', 'sliding_window', self.context_name)
+
+    def __update_communities(self):
+        if self.__delta is not None:
+            # drift is the weight of the edges added since the communities were found wrt their weight then
+            delta_weight = int(self.__delta_edges.weight.sum())
+            drift = self.datasources.files.read(
+                'context_update', 'update_communities', 'drift', 'json', self.context_name) \
+                if self.datasources.files.exists(
+                    'context_update', 'update_communities', 'drift', 'json', self.context_name) \
+                else {'detection_weight': int(self.__edges.weight.sum()) - delta_weight, 'delta_weight': 0}
+            drift['delta_weight'] += delta_weight
+            drift_threshold = self.datasources.community_detection.get_config().get('drift_threshold', .1)
+
+            if drift['delta_weight'] > drift_threshold * drift['detection_weight']:
+                # any weight added to a network without weights when the communities were found is a full drift
+                drift_ratio = drift['delta_weight'] / drift['detection_weight'] if drift['detection_weight'] \
+                    else float('inf')
+                logger.info(f'drift {drift_ratio:.4f} over {drift_threshold}, find communities again')
+                communities = self.datasources.files.read(
+                    'community_detection', 'find_communities', 'communities', 'csv', self.context_name)
+                self.datasources.files.write(
+                    communities, 'community_detection', 'warm_start', 'previous_communities', 'csv',
+                    self.context_name)
+
+                self.__remove_stages('community_detection', ['find_communities', 'add_communities_to_nodes',
+                                                             'add_communities_to_graph',
+                                                             'remove_lone_nodes_from_edges'])
+                self.__remove_stages('community_detection_metrics')
+                self.__remove_stages('profile_metrics')
+                self.__remove_stages('usercontext_metrics')
+                drift = {'detection_weight': int(self.__edges.weight.sum()), 'delta_weight': 0}
+            else:
+                # communities are kept, only what depends on the edge weights is computed again
+                self.__update_node_metrics()
+                self.__remove_stages('community_detection', ['add_communities_to_graph',
+                                                             'remove_lone_nodes_from_edges'])
+                self.__remove_stages('community_detection_metrics', ['pquality', 'partition_summary'])
+                self.__remove_stages('profile_metrics', ['remove_nonexistent_users'])
+                self.__remove_stages('usercontext_metrics', ['compute_metrics'])
+
+            self.datasources.files.write(
+                drift, 'context_update', 'update_communities', 'drift', 'json', self.context_name)
+
+            for pipeline in self.pipelines:
+                pipeline.execute()
+
+    def __update_node_metrics(self):
+        # in degree, in degree centrality and h-index within the communities with new edges
+        nodes = self.datasources.files.read(
+            'community_detection_metrics', 'node_metrics', 'nodes', 'csv', self.context_name)
+        if nodes is None:
+            return
+        communities = nodes[['user_id', 'community']]
+
+        def community_edges(edges):
+            return edges.merge(communities.rename(columns={'user_id': 'source_id'}), on='source_id') \
+                .merge(communities.rename(columns={'user_id': 'target_id'}), on=['target_id', 'community'])
+
+        updated_communities = community_edges(self.__delta_edges)['community'].unique()
+        if not len(updated_communities):
+            return
+
+        edges = community_edges(self.__edges)
+        edges = edges[edges['community'].isin(updated_communities)] \
+            .sort_values(by=['target_id', 'community', 'weight'], ascending=[True, True, False])
+        edges['is_hindex'] = edges['weight'] >= edges.groupby(['target_id', 'community']).cumcount() + 1
+        node_metrics = edges.groupby(['target_id', 'community']) \
+            .agg(indegree=('weight', 'size'), hindex=('is_hindex', 'sum'))
+
+        is_updated = nodes['community'].isin(updated_communities)
+        updated_nodes = nodes[is_updated].merge(node_metrics, how='left', left_on=['user_id', 'community'],
+                                                right_index=True, suffixes=('_old', ''))
+        community_sizes = communities.groupby('community').size()
+        no_others = updated_nodes['community'].map(community_sizes) - 1
+
+        updated_nodes['indegree'] = updated_nodes['indegree'].fillna(0)
+        updated_nodes['indegree_centrality'] = (updated_nodes['indegree'] / no_others.where(no_others > 0)).fillna(1)
+        updated_nodes['hindex'] = updated_nodes['hindex'].fillna(0)
+        for metric in ['indegree', 'indegree_centrality', 'hindex']:
+            nodes.loc[is_updated, metric] = updated_nodes[metric].to_numpy(dtype=nodes[metric].dtype)
+
+        self.datasources.files.write(
+            nodes, 'community_detection_metrics', 'node_metrics', 'nodes', 'csv', self.context_name)
+
+    def __remove_stages(self, pipeline_name, stage_names=None):
+        for stage_name in stage_names if stage_names else list(self.datasources.files.model[pipeline_name]):
+            self.datasources.files.remove_stage(pipeline_name, stage_name, self.context_name)
@@ -1,6 +1,7 @@
 import logging
-import networkx as nx
+import numpy as np
 import pandas as pd
+from pipelines.helper import get_edges
 from pipelines.pipeline_base import PipelineBase
 
 logger = logging.getLogger(__name__)
@@ -62,28 +63,46 @@ class NetworkCreation(PipelineBase):
         ]
         tasks = [self.__create_network, self.__create_nodes, self.__create_edges, self.__create_graph]
         self.context_name = context_name
+        self.__network = None
         super(NetworkCreation, self).__init__('network_creation', files, tasks, datasources)
 
-    def __create_network(self):
-        if not self.datasources.files.exists(
-                'network_creation', 'create_network', 'network', 'csv', self.context_name):
+    def __get_network(self):
+        # network, nodes and edges are computed in one pass from the stream and shared by the tasks
+        if self.__network is None:
             stream = self.datasources.files.read(
                 'context_harvesting', 'harvest_context', 'stream_expanded', 'csv', self.context_name)
 
-            stream = stream[['user_name', 'mentions']].explode('mentions').dropna() \
+            network = stream[['user_name', 'mentions']].explode('mentions').dropna() \
                 .rename(columns={'user_name': 'from_username', 'mentions': 'to_username'})
 
+            # user names to codes, codes to the global user ids
+            codes, user_names = pd.factorize(np.concatenate([network.from_username.to_numpy(),
+                                                             network.to_username.to_numpy()]))
+            user_ids = self.datasources.user_ids.get_ids(user_names)
+            source_ids = user_ids[codes[:len(network)]]
+            target_ids = user_ids[codes[len(network):]]
+
+            nodes = pd.DataFrame({'user_name': user_names}, index=pd.Index(user_ids, name='user_id')).sort_index()
+
+            # weights are the counts of the (source_id, target_id) pairs
+            edges = get_edges(source_ids, target_ids)
+
+            self.__network = network, nodes, edges
+
+        return self.__network
+
+    def __create_network(self):
+        if not self.datasources.files.exists(
+                'network_creation', 'create_network', 'network', 'csv', self.context_name):
+            network, _, _ = self.__get_network()
+
             self.datasources.files.write(
-                stream, 'network_creation', 'create_network', 'network', 'csv', self.context_name)
+                network, 'network_creation', 'create_network', 'network', 'csv', self.context_name)
 
     def __create_nodes(self):
         if not self.datasources.files.exists(
                 'network_creation', 'create_nodes', 'nodes', 'csv', self.context_name):
-            network = self.datasources.files.read(
-                'network_creation', 'create_network', 'network', 'csv', self.context_name)
-            nodes = pd.concat([network.from_username, network.to_username], axis=0).drop_duplicates() \
-                .sort_values().reset_index(drop=True).to_frame('user_name')
-            nodes.index.names = ['user_id']
+            _, nodes, _ = self.__get_network()
 
             self.datasources.files.write(
                 nodes, 'network_creation', 'create_nodes', 'nodes', 'csv', self.context_name)
@@ -91,24 +110,7 @@ class NetworkCreation(PipelineBase):
     def __create_edges(self):
         if not self.datasources.files.exists(
                 'network_creation', 'create_edges', 'edges', 'csv', self.context_name):
-            network = self.datasources.files.read(
-                'network_creation', 'create_network', 'network', 'csv', self.context_name)
-            nodes = self.datasources.files.read(
-                'network_creation', 'create_nodes', 'nodes', 'csv', self.context_name)
-
-            # create edges
-            edges = network[['from_username', 'to_username']] \
-                .rename(columns={'from_username': 'source_id', 'to_username': 'target_id'})
-
-            # assign weights
-            edges['weight'] = 1
-            edges = edges.groupby(['source_id', 'target_id']).sum().reset_index() \
-                .sort_values(by=['source_id', 'target_id'])
-
-            # rename edges
-            nodes_dict = pd.Series(nodes['user_name'].index, index=nodes['user_name']).to_dict()
-            edges.source_id = edges.source_id.map(nodes_dict.get)
-            edges.target_id = edges.target_id.map(nodes_dict.get)
+            _, _, edges = self.__get_network()
 
             self.datasources.files.write(
                 edges, 'network_creation', 'create_edges', 'edges', 'csv', self.context_name)
@@ -116,10 +118,8 @@ class NetworkCreation(PipelineBase):
     def __create_graph(self):
         if not self.datasources.files.exists(
                 'network_creation', 'create_graph', 'graph', 'gexf', self.context_name):
-            nodes = self.datasources.files.read(
-                'network_creation', 'create_nodes', 'nodes', 'csv', self.context_name)
-            edges = self.datasources.files.read(
-                'network_creation', 'create_edges', 'edges', 'csv', self.context_name)
+            import networkx as nx
+            _, nodes, edges = self.__get_network()
             graph = nx.from_pandas_edgelist(edges,
                                             source='source_id', target='target_id', edge_attr=['weight'],
                                             create_using=nx.DiGraph())
@@ -1,12 +1,14 @@
 import logging
-import networkx as nx
 import pandas as pd
-from pipelines.pipeline_base import PipelineBase
+from pipelines.pipeline_base import PipelineBase, cpu_bound
+from .network_creation import NetworkCreation
 
 logger = logging.getLogger(__name__)
 
 
 class NetworkMetrics(PipelineBase):
+    input_pipelines = [NetworkCreation]
+
     def __init__(self, datasources, context_name):
         files = [
             {
@@ -49,9 +51,11 @@ class NetworkMetrics(PipelineBase):
         self.context_name = context_name
         super(NetworkMetrics, self).__init__('network_metrics', files, tasks, datasources)
 
+    @cpu_bound
     def __graph_summary(self):
         if not self.datasources.files.exists(
                 'network_metrics', 'graph_summary', 'graph_summary', 'csv', self.context_name):
+            import networkx as nx
             graph = self.datasources.files.read(
                 'network_creation', 'create_graph', 'graph', 'gexf', self.context_name)
 
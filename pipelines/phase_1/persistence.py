@@ -9,8 +9,7 @@ logger = logging.getLogger(__name__)
 class Persistence(PipelineBase):
     def __init__(self, datasources, context_name):
         files = []
-        tasks = [self.__add_context, self.__add_graph, self.__add_partition, self.__add_communities, self.__add_users,
-                 self.__add_profiles, self.__add_user_communities, self.__add_user_context]
+        tasks = [self.__add_context, self.__add_users, self.__add_profiles, self.__replace_context_network]
         self.context_name = context_name
         super(Persistence, self).__init__('persistence', files, tasks, datasources)
 
@@ -28,76 +27,26 @@ class Persistence(PipelineBase):
         except IntegrityError:
             logger.debug('context already exists or constraint is violated and could not be added')
 
-    def __add_graph(self):
-        graph_summary = self.datasources.files.read(
-            'network_metrics', 'graph_summary', 'graph_summary', 'csv', self.context_name)
-        graph_record = graph_summary.to_dict('records')[0]
-
-        try:
-            with self.datasources.database.session_scope() as session:
-                context_entity = session.query(Context).filter(Context.name == self.context_name).first()
-                graph_entity = Graph(**graph_record, context=context_entity)
-                session.add(graph_entity)
-            logger.debug('graph successfully persisted')
-        except IntegrityError:
-            logger.debug('graph already exists or constraint is violated and could not be added')
-
-    def __add_partition(self):
-        partition = self.datasources.files.read(
-            'community_detection_metrics', 'pquality', 'pquality', 'csv', self.context_name)
-        partition_record = partition[['avg']].T.to_dict('records')[0]
-
-        try:
-            with self.datasources.database.session_scope() as session:
-                graph_entity = session.query(Graph).join(Graph.context) \
-                    .filter(Context.name == self.context_name).first()
-                partition_entity = Partition(**partition_record, graph=graph_entity)
-                session.add(partition_entity)
-            logger.debug('partition successfully persisted')
-        except IntegrityError:
-            logger.debug('partition already exists or constraint is violated and could not be added')
-
-    def __add_communities(self):
-        partition_summary = self.datasources.files.read(
-            'community_detection_metrics', 'partition_summary', 'partition_summary', 'csv', self.context_name)
-        communities = [{'name': c} for c in partition_summary.index.tolist()]
-
-        try:
-            with self.datasources.database.session_scope() as session:
-                partition_entity = session.query(Partition).join(Partition.graph).join(Graph.context) \
-                    .filter(Context.name == self.context_name).first()
-
-                community_entities = [Community(**c, partition=partition_entity) for c in communities]
-                session.add_all(community_entities)
-            logger.debug('communities successfully persisted')
-        except IntegrityError:
-            logger.debug('community already exists or constraint is violated and could not be added')
-
     def __add_users(self):
         users = self.datasources.files.read(
             'profile_metrics', 'profile_info', 'profile_info', 'csv', self.context_name)
 
-        user_records = users.to_dict('records')
-        user_names = users['user_name'].tolist()
+        # users are identified by their global user ids
+        user_records = users.rename_axis('id').reset_index().to_dict('records')
+        user_ids = users.index.tolist()
 
         try:
             with self.datasources.database.session_scope() as session:
                 # get users and split to insert and to update
-                user_entities_toupdate = session.query(User.id, User.user_name)\
-                    .filter(User.user_name.in_(user_names)).all()
-                users_toupdate = [u[1] for u in user_entities_toupdate]
-                users_toinsert = set(user_names) - set(users_toupdate)
+                users_toupdate = {u_id for u_id, in session.query(User.id).filter(User.id.in_(user_ids)).all()}
 
                 # update old users
-                user_records_toupdate =\
-                    [dict([u for u in user_records if u['user_name'] == u_username_old][0], **{'id': u_id_old})
-                     for u_id_old, u_username_old in user_entities_toupdate]
+                user_records_toupdate = [u for u in user_records if u['id'] in users_toupdate]
                 session.bulk_update_mappings(User, user_records_toupdate)
 
                 # insert new users
-                user_records_toinsert = [u for u in user_records if u['user_name'] in users_toinsert]
-                user_entities_toinsert = [User(**u) for u in user_records_toinsert]
-                session.add_all(user_entities_toinsert)
+                user_records_toinsert = [u for u in user_records if u['id'] not in users_toupdate]
+                session.bulk_insert_mappings(User, user_records_toinsert)
 
             logger.debug('user info successfully persisted')
         except IntegrityError:
@@ -107,94 +56,116 @@ class Persistence(PipelineBase):
         profiles = self.datasources.files.read(
             'profile_metrics', 'follower_rank', 'profiles', 'csv', self.context_name)
 
-        profile_records = profiles.to_dict('records')
-        user_names = profiles['user_name'].tolist()
+        profile_records = profiles.reset_index()[['user_id', 'follower_rank']].to_dict('records')
+        user_ids = profiles.index.tolist()
 
         try:
             with self.datasources.database.session_scope() as session:
                 # update old profiles
-                userprofiles_entities_toupdate = session.query(Profile.id, User) \
-                    .join(User.profile).filter(User.user_name.in_(user_names)).all()
-                profile_records_toupdate =\
-                    [dict([u for u in profile_records if u['user_name'] == u_old.user_name][0], **{'id': p_id})
-                     for p_id, u_old in userprofiles_entities_toupdate]
+                profiles_toupdate = dict(session.query(Profile.user_id, Profile.id)
+                                         .filter(Profile.user_id.in_(user_ids)).all())
+                profile_records_toupdate = [dict(p, **{'id': profiles_toupdate[p['user_id']]})
+                                            for p in profile_records if p['user_id'] in profiles_toupdate]
                 session.bulk_update_mappings(Profile, profile_records_toupdate)
 
                 # insert new profiles
-                profiles_toupdate = [u_old.user_name for p_id, u_old in userprofiles_entities_toupdate]
-                profiles_toinsert = set(user_names) - set(profiles_toupdate)
-                user_entities_toinsert = session.query(User) \
-                    .filter(User.user_name.in_(profiles_toinsert)).all()
-
-                profile_entities = []
-                for user_entity in user_entities_toinsert:
-                    profile_record = list(filter(lambda x: x['user_name'] == user_entity.user_name, profile_records))[0]
-                    profile_entity = Profile(follower_rank=profile_record['follower_rank'], user=user_entity)
-                    profile_entities.append(profile_entity)
-
-                session.add_all(profile_entities)
+                profile_records_toinsert = [p for p in profile_records if p['user_id'] not in profiles_toupdate]
+                session.bulk_insert_mappings(Profile, profile_records_toinsert)
             logger.debug('profile metrics successfully persisted')
         except IntegrityError:
             logger.debug('profile metrics already exists or constraint is violated and could not be added')
 
-    def __add_user_context(self):
-        usercontexts = self.datasources.files.read(
-            'usercontext_metrics', 'compute_metrics', 'usercontext_metrics', 'csv', self.context_name)
-
-        usercontext_records = usercontexts.set_index('user_name').to_dict('index')
-
+    def __replace_context_network(self):
+        # graph, partition, communities and user metrics of the context replace the ones of a previous execution
+        # (e.g. of a context update) in one transaction
         try:
             with self.datasources.database.session_scope() as session:
-                # get all users for current dataset
-                user_entities = session.query(User) \
-                    .filter(User.user_name.in_(usercontext_records.keys())).all()
-
-                # get current context
                 context_entity = session.query(Context).filter(Context.name == self.context_name).first()
+                self.__remove_context_network(session, context_entity.id)
+
+                graph_entity = self.__add_graph(session, context_entity)
+                partition_entity = self.__add_partition(session, graph_entity)
+                community_ids = self.__add_communities(session, partition_entity)
+                self.__add_user_communities(session, community_ids)
+                self.__add_user_context(session, context_entity.id)
+            logger.debug('context network successfully persisted')
+        except IntegrityError:
+            logger.error('context network violates a constraint and could not be added')
+            raise
+
+    @staticmethod
+    def __remove_context_network(session, context_id):
+        graph_ids = [g_id for g_id, in session.query(Graph.id).filter(Graph.context_id == context_id)]
+        partition_ids = [p_id for p_id, in session.query(Partition.id).filter(Partition.graph_id.in_(graph_ids))]
+        community_ids = [c_id for c_id, in session.query(Community.id)
+                         .filter(Community.partition_id.in_(partition_ids))]
+
+        session.query(UserCommunity).filter(UserCommunity.community_id.in_(community_ids)) \
+            .delete(synchronize_session=False)
+        session.query(Community).filter(Community.id.in_(community_ids)).delete(synchronize_session=False)
+        session.query(Partition).filter(Partition.id.in_(partition_ids)).delete(synchronize_session=False)
+        session.query(Graph).filter(Graph.id.in_(graph_ids)).delete(synchronize_session=False)
+        session.query(UserContext).filter(UserContext.context_id == context_id).delete(synchronize_session=False)
+        session.expire_all()
+
+        if graph_ids:
+            logger.debug(f'previous context network removed ({len(community_ids)} communities)')
+
+    def __add_graph(self, session, context_entity):
+        graph_summary = self.datasources.files.read(
+            'network_metrics', 'graph_summary', 'graph_summary', 'csv', self.context_name)
+        graph_record = graph_summary.to_dict('records')[0]
 
-                usercontext_entities = []
-                for user_name, metrics in usercontext_records.items():
-                    # get user entities and usercontext info
-                    user_entity = next(filter(lambda x: x.user_name == user_name, user_entities), None)
+        graph_entity = Graph(**graph_record, context=context_entity)
+        session.add(graph_entity)
 
-                    # create usercontext entity
-                    usercontext_entity = UserContext(**metrics, user=user_entity, context=context_entity)
-                    usercontext_entities.append(usercontext_entity)
+        return graph_entity
 
-                session.add_all(usercontext_entities)
-            logger.debug('usercontext info successfully persisted')
-        except IntegrityError:
-            logger.debug('usercontext info already exists or constraint is violated and could not be added')
+    def __add_partition(self, session, graph_entity):
+        partition = self.datasources.files.read(
+            'community_detection_metrics', 'pquality', 'pquality', 'csv', self.context_name)
+        partition_record = partition[['avg']].T.to_dict('records')[0]
+
+        partition_entity = Partition(**partition_record, graph=graph_entity)
+        session.add(partition_entity)
+
+        return partition_entity
 
-    def __add_user_communities(self):
+    def __add_communities(self, session, partition_entity):
+        partition_summary = self.datasources.files.read(
+            'community_detection_metrics', 'partition_summary', 'partition_summary', 'csv', self.context_name)
+
+        community_entities = [Community(name=c, partition=partition_entity)
+                              for c in partition_summary.index.tolist()]
+        session.add_all(community_entities)
+        session.flush()
+
+        return {c.name: c.id for c in community_entities}
+
+    def __add_user_communities(self, session, community_ids):
         nodes = self.datasources.files.read(
             'profile_metrics', 'remove_nonexistent_users', 'nodes', 'csv', self.context_name)
         node_records = nodes.to_dict('records')
-        user_names = nodes['user_name'].drop_duplicates().tolist()
 
-        try:
-            with self.datasources.database.session_scope() as session:
-                # get all commmunities for current dataset partition
-                community_entities = session.query(Community) \
-                    .join(Community.partition).join(Partition.graph).join(Graph.context) \
-                    .filter(Context.name == self.context_name).all()
-
-                # get all users for current dataset
-                user_entities = session.query(User) \
-                    .filter(User.user_name.in_(user_names)).all()
-
-                usercommunity_entities = []
-                for u in node_records:
-                    # get user and community entities and usercommunity info
-                    community_entity = list(filter(lambda x: x.name == u['community'], community_entities))[0]
-                    user_entity = list(filter(lambda x: x.user_name == u['user_name'], user_entities))[0]
-
-                    # create usercommunity entity
-                    usercommunity_entity = UserCommunity(indegree=u['indegree'],
-                                                         indegree_centrality=u['indegree_centrality'],
-                                                         hindex=u['hindex'],
-                                                         user=user_entity, community=community_entity)
-                    usercommunity_entities.append(usercommunity_entity)
-                session.add_all(usercommunity_entities)
-        except IntegrityError:
-            logger.debug('usercommunity already exists or constraint is violated and could not be added')
+        # nodes are joined to users by their global user ids
+        usercommunity_records = [{'indegree': u['indegree'],
+                                  'indegree_centrality': u['indegree_centrality'],
+                                  'hindex': u['hindex'],
+                                  'user_id': u['user_id'],
+                                  'community_id': community_ids[u['community']]} for u in node_records]
+        session.bulk_insert_mappings(UserCommunity, usercommunity_records)
+
+    def __add_user_context(self, session, context_id):
+        usercontexts = self.datasources.files.read(
+            'usercontext_metrics', 'compute_metrics', 'usercontext_metrics', 'csv', self.context_name)
+
+        # only users with a global user id and a user row are stored
+        usercontexts['user_id'] = self.datasources.user_ids.find_ids(usercontexts['user_name'])
+        usercontexts = usercontexts[usercontexts['user_id'] >= 0]
+        user_ids = {u_id for u_id, in session.query(User.id).filter(User.id.in_(usercontexts['user_id'].tolist()))}
+        usercontext_records = [dict(u, **{'context_id': context_id})
+                               for u in usercontexts.drop(columns='user_name').to_dict('records')
+                               if u['user_id'] in user_ids]
+        logger.debug(f'{len(usercontexts.index) - len(usercontext_records)} usercontexts of unknown users')
+
+        session.bulk_insert_mappings(UserContext, usercontext_records)
@@ -0,0 +1,139 @@
+import logging
+import numpy as np
+import pandas as pd
+from pipelines.pipeline_base import PipelineBase
+
+logger = logging.getLogger(__name__)
+
+
+class TemporalNetwork(PipelineBase):
+    def __init__(self, datasources, context_name):
+        files = [
+            {
+                'stage_name': 'sliding_window',
+                'file_name': 'window_summaries',
+                'file_extension': 'csv',
+                'file_prefix': context_name,
+                'r_kwargs': {
+                    'dtype': {
+                        'no_tweets': 'uint32',
+                        'no_nodes': 'uint32',
+                        'no_edges': 'uint32',
+                        'avg_degree': 'float32',
+                        'avg_weighted_degree': 'float32',
+                        'density': 'float32'
+                    },
+                    'parse_dates': ['start', 'end'],
+                    'index_col': 'start'
+                }
+            },
+            {
+                'stage_name': 'sliding_window',
+                'file_name': 'window_deg_dist',
+                'file_extension': 'csv',
+                'file_prefix': context_name,
+                'r_kwargs': {
+                    'dtype': {
+                        'degree': 'uint32',
+                        'cumsum_of_the_no_of_nodes': 'float32'
+                    },
+                    'parse_dates': ['start']
+                },
+                'w_kwargs': {
+                    'index': False
+                }
+            }
+        ]
+        tasks = [self.__sliding_window]
+        self.context_name = context_name
+        super(TemporalNetwork, self).__init__('temporal_network', files, tasks, datasources)
+
+    def __sliding_window(self):
+        config = self.datasources.temporal_network.get_config()
+        if config['window'] and not self.datasources.files.exists(
+                'temporal_network', 'sliding_window', 'window_summaries', 'csv', self.context_name):
+            stream = self.datasources.files.read(
+                'context_harvesting', 'harvest_context', 'stream_expanded', 'csv', self.context_name)
+
+            # mentions sorted by date once, edges and nodes as integer codes
+            network = stream[['date', 'user_name', 'mentions']].explode('mentions').dropna()
+            network['date'] = pd.to_datetime(network['date'])
+            network = network.sort_values(by='date', kind='stable')
+            dates = network['date'].to_numpy()
+            tweet_dates = np.sort(pd.to_datetime(stream['date']).to_numpy())
+
+            node_codes, node_names = pd.factorize(np.concatenate([network['user_name'].to_numpy(),
+                                                                  network['mentions'].to_numpy()]))
+            source_codes = node_codes[:len(network)]
+            target_codes = node_codes[len(network):]
+            edge_codes, edge_keys = pd.factorize((source_codes.astype('uint64') << np.uint64(32)) |
+                                                 target_codes.astype('uint64'))
+            edge_sources = (edge_keys >> np.uint64(32)).astype('int64')
+            edge_targets = (edge_keys & np.uint64(0xffffffff)).astype('int64')
+
+            weights = np.zeros(len(edge_keys), dtype='int64')
+            degrees = np.zeros(len(node_names), dtype='int64')
+            no_edges = 0
+
+            def update_edges(rows, sign):
+                # edges appearing or disappearing change the degree of their nodes
+                codes, counts = np.unique(edge_codes[rows], return_counts=True)
+                previous_weights = weights[codes]
+                weights[codes] += sign * counts
+                changed_codes = codes[previous_weights == 0] if sign > 0 else codes[weights[codes] == 0]
+                np.add.at(degrees, edge_sources[changed_codes], sign)
+                np.add.at(degrees, edge_targets[changed_codes], sign)
+
+                return sign * len(changed_codes)
+
+            window = pd.Timedelta(config['window'])
+            step = pd.Timedelta(config['step'] or config['window'])
+            starts = pd.date_range(pd.Timestamp(dates[0]).floor(step), pd.Timestamp(dates[-1]), freq=step) \
+                if len(dates) else []
+
+            logger.info(f'sliding window of {window} every {step} over {len(starts)} windows')
+
+            summaries = []
+            deg_dists = []
+            start_row = end_row = 0
+            for start in starts:
+                # entering tweets are added before the leaving ones are subtracted
+                new_end_row = np.searchsorted(dates, (start + window).to_datetime64(), side='left')
+                new_start_row = np.searchsorted(dates, start.to_datetime64(), side='left')
+                no_edges += update_edges(np.arange(end_row, new_end_row), 1)
+                no_edges += update_edges(np.arange(start_row, new_start_row), -1)
+                start_row, end_row = new_start_row, new_end_row
+
+                window_degrees = degrees[degrees > 0]
+                no_nodes = len(window_degrees)
+                summaries.append({
+                    'start': start,
+                    'end': start + window,
+                    'no_tweets': np.searchsorted(tweet_dates, (start + window).to_datetime64(), side='left') -
+                    np.searchsorted(tweet_dates, start.to_datetime64(), side='left'),
+                    'no_nodes': no_nodes,
+                    'no_edges': no_edges,
+                    'avg_degree': 2 * no_edges / no_nodes if no_nodes else None,
+                    'avg_weighted_degree': 2 * (end_row - start_row) / no_nodes if no_nodes else None,
+                    'density': no_edges / (no_nodes * (no_nodes - 1)) if no_nodes > 1 else None
+                })
+
+                if no_nodes:
+                    degree_counts = np.bincount(window_degrees)
+                    degree_values = np.flatnonzero(degree_counts)
+                    deg_dists.append(pd.DataFrame({
+                        'start': start,
+                        'degree': degree_values,
+                        'cumsum_of_the_no_of_nodes': degree_counts[degree_values][::-1].cumsum()[::-1] / no_nodes
+                    }))
+
+            summaries_df = pd.DataFrame(summaries, columns=['start', 'end', 'no_tweets', 'no_nodes', 'no_edges',
+                                                            'avg_degree', 'avg_weighted_degree', 'density']) \
+                .set_index('start').round({'avg_degree': 4, 'avg_weighted_degree': 4, 'density': 4})
+            deg_dist_df = pd.concat(deg_dists) if deg_dists else \
+                pd.DataFrame(columns=['start', 'degree', 'cumsum_of_the_no_of_nodes'])
+
+            self.datasources.files.write(
+                deg_dist_df, 'temporal_network', 'sliding_window', 'window_deg_dist', 'csv', self.context_name)
+            self.datasources.files.write(
+                summaries_df, 'temporal_network', 'sliding_window', 'window_summaries', 'csv', self.context_name)
@@ -1,7 +1,7 @@
 import logging
 from datetime import datetime
 import pandas as pd
-from pipelines.helper import str_to_list
+from pipelines.ragged_array import RaggedArray
 from pipelines.pipeline_base import PipelineBase
 
 logger = logging.getLogger(__name__)
@@ -27,14 +27,12 @@ class UserContextMetrics(PipelineBase):
                         'no_retweets': 'uint32',
                         'no_replies': 'uint32',
                         'is_retweet': bool,
-                        'is_media': bool
-
-                    },
-                    'converters': {
-                        'hashtags': str_to_list,
-                        'urls': str_to_list,
-                        'mentions': str_to_list,
-                        'retweeted_hashtags': str_to_list
+                        'is_media': bool,
+                        # list columns are kept as written, see RaggedArray
+                        'hashtags': str,
+                        'urls': str,
+                        'mentions': str,
+                        'retweeted_hashtags': str
                     },
                     'parse_dates': ['date'],
                     'date_parser': lambda x: datetime.strptime(x, '%Y-%m-%d %H:%M:%S')
@@ -93,12 +91,13 @@ class UserContextMetrics(PipelineBase):
             context = self.datasources.contexts.get_context(self.context_name)
             context_record = context.reset_index().to_dict('records')[0]
 
-            stream['tw_ontopic'] =\
-                stream['hashtags'].apply(lambda t: any(h in context_record['hashtags'] for h in t)) |\
-                stream['retweeted_hashtags'].apply(lambda t: any(h in context_record['hashtags'] for h in t))
+            stream['tw_ontopic'] = \
+                RaggedArray.from_series(stream['hashtags']).isin(context_record['hashtags']) | \
+                RaggedArray.from_series(stream['retweeted_hashtags']).isin(context_record['hashtags'])
 
-            stream['link_ontopic'] = stream[stream['tw_ontopic']]['urls'].apply(lambda t: t != [''])
-            stream['link_ontopic'].fillna(False, inplace=True)
+            # on topic tweets with urls other than a single empty one
+            urls = RaggedArray.from_series(stream['urls'])
+            stream['link_ontopic'] = stream['tw_ontopic'] & ~((urls.lengths == 1) & urls.isin(['']))
 
             # topical attachment
             def topical_attachment_alg(tw_ontopic, tw_offtopic, link_ontopic, link_offtopic):
@@ -1,6 +1,4 @@
 import logging
-import infomap
-import networkx as nx
 import pandas as pd
 from pipelines.pipeline_base import PipelineBase
 
@@ -33,6 +31,8 @@ class BipartiteCommunityDetection(PipelineBase):
     def __find_communities(self):
         if not self.datasources.files.exists(
                 'bipartite_community_detection', 'find_communities', 'graph', 'gexf'):
+            import infomap
+            import networkx as nx
             graph = self.datasources.files.read(
                 'bipartite_graph', 'get_user_hashtag_graph', 'graph', 'gexf')
             graph = nx.convert_node_labels_to_integers(graph, label_attribute='name')
@@ -1,6 +1,7 @@
 import logging
+import os
+import numpy as np
 import pandas as pd
-import networkx as nx
 from pipelines.pipeline_base import PipelineBase
 
 logger = logging.getLogger(__name__)
@@ -67,45 +68,62 @@ class BipartiteGraph(PipelineBase):
                  self.__get_user_hashtag_network, self.__get_user_hashtag_graph]
         super(BipartiteGraph, self).__init__('bipartite_graph', files, tasks, datasources)
 
+    def __aggregate_user_timelines(self, columns, in_memory, map_chunk, reduce_partition, key_columns):
+        # timelines over the memory budget are mapped in chunks to partial networks spilled to disk in partitions
+        # by key columns, each partition is reduced on its own
+        if self.memory_budget is None:
+            return in_memory(self.datasources.files.read(
+                'user_timelines', 'get_user_timelines', 'user_timelines', 'csv')[columns])
+
+        from pipelines.partitioned_aggregation import PartitionedAggregation
+        chunks = (chunk[columns] for chunk in self.datasources.files.read_chunks(
+            'user_timelines', 'get_user_timelines', 'user_timelines', 'csv'))
+
+        return PartitionedAggregation.aggregate(chunks, self.memory_budget, in_memory, map_chunk, reduce_partition,
+                                                key_columns, os.path.join(self.datasources.output_path, 'spill'))
+
+    @staticmethod
+    def __get_user_pairs(user_timelines):
+        # distinct directions of the mentions between each (ordered) pair of users
+        from pipelines.ragged_array import RaggedArray
+        mentions = RaggedArray.from_series(user_timelines['mentions'])
+        from_usernames = user_timelines['user_name'].to_numpy()[mentions.rows]
+        to_usernames = mentions.values
+        is_forward = from_usernames <= to_usernames
+
+        return pd.DataFrame({
+            'from_username': np.where(is_forward, from_usernames, to_usernames),
+            'to_username': np.where(is_forward, to_usernames, from_usernames),
+            'is_forward': is_forward
+        }).drop_duplicates()
+
     def __get_user_network(self):
         if not self.datasources.files.exists('bipartite_graph', 'get_user_network', 'user_network', 'csv'):
-            user_timelines = self.datasources.files.read(
-                'user_timelines', 'get_user_timelines', 'user_timelines', 'csv')[['user_name', 'mentions']]
-
-            # create user edges
-            users_network = user_timelines[user_timelines['mentions'].map(lambda m: len(m) > 0)].explode('mentions') \
-                .rename(columns={'user_name': 'from_username', 'mentions': 'to_username'}) \
-                .drop_duplicates()
+            from pipelines.cooccurrence import CoOccurrence
 
             # count users co-occurrences
-            users_network['from_username'], users_network['to_username'] = \
-                users_network.min(axis=1), users_network.max(axis=1)
-            users_network['weight'] = 1
-            users_network = users_network.groupby(['from_username', 'to_username']).sum().reset_index()
+            users_network = self.__aggregate_user_timelines(
+                ['user_name', 'mentions'],
+                lambda user_timelines: CoOccurrence(user_timelines).user_network(),
+                self.__get_user_pairs,
+                lambda user_pairs: user_pairs.drop_duplicates().groupby(['from_username', 'to_username'])
+                .size().rename('weight').reset_index(),
+                ['from_username', 'to_username'])
 
             self.datasources.files.write(
                 users_network, 'bipartite_graph', 'get_user_network', 'user_network', 'csv')
 
     def __get_hashtag_network(self):
         if not self.datasources.files.exists('bipartite_graph', 'get_hashtag_network', 'hashtag_network', 'csv'):
-            hashtags_network = self.datasources.files.read(
-                'user_timelines', 'get_user_timelines', 'user_timelines', 'csv')['hashtags']
-
-            # pair co-occurred hashtags
-            hashtags_network = hashtags_network \
-                .map(lambda h_list: [(h1, h2) if h1 < h2 else (h2, h1)
-                                     for i, h1 in enumerate(h_list)
-                                     for h2 in h_list[:i]])
-
-            # create hashtag edges
-            hashtags_network = hashtags_network.explode().dropna()
-            hashtags_network = pd.DataFrame(hashtags_network.tolist(),
-                                            columns=['from_hashtag', 'to_hashtag'],
-                                            index=hashtags_network.index)
+            from pipelines.cooccurrence import CoOccurrence
 
             # count hashtags co-occurrences
-            hashtags_network['weight'] = 1
-            hashtags_network = hashtags_network.groupby(['from_hashtag', 'to_hashtag']).sum().reset_index()
+            hashtags_network = self.__aggregate_user_timelines(
+                ['hashtags'],
+                lambda user_timelines: CoOccurrence(user_timelines).hashtag_network(),
+                lambda user_timelines: CoOccurrence(user_timelines).hashtag_network(),
+                lambda network: network.groupby(['from_hashtag', 'to_hashtag'], as_index=False)['weight'].sum(),
+                ['from_hashtag', 'to_hashtag'])
 
             self.datasources.files.write(
                 hashtags_network, 'bipartite_graph', 'get_hashtag_network', 'hashtag_network', 'csv')
@@ -113,20 +131,15 @@ class BipartiteGraph(PipelineBase):
     def __get_user_hashtag_network(self):
         if not self.datasources.files.exists(
                 'bipartite_graph', 'get_user_hashtag_network', 'user_hashtag_network', 'csv'):
-            user_timelines = self.datasources.files.read(
-                'user_timelines', 'get_user_timelines', 'user_timelines', 'csv')[['user_name', 'hashtags']]
-
-            # hashtag list per user_name
-            hashtags_users_network = user_timelines.groupby('user_name').sum()
-
-            # explode hashtags
-            hashtags_users_network = hashtags_users_network.explode('hashtags') \
-                .rename(columns={'hashtags': 'hashtag'}).reset_index().dropna()
+            from pipelines.cooccurrence import CoOccurrence
 
-            hashtags_users_network = hashtags_users_network \
-                .groupby(['user_name', 'hashtag']).size().reset_index(name='weight') \
-                .sort_values(by=['user_name', 'hashtag'], ascending=True) \
-                .reset_index(drop=True)
+            # count hashtags per user_name
+            hashtags_users_network = self.__aggregate_user_timelines(
+                ['user_name', 'hashtags'],
+                lambda user_timelines: CoOccurrence(user_timelines).user_hashtag_network(),
+                lambda user_timelines: CoOccurrence(user_timelines).user_hashtag_network(),
+                lambda network: network.groupby(['user_name', 'hashtag'], as_index=False)['weight'].sum(),
+                ['user_name', 'hashtag'])
 
             self.datasources.files.write(
                 hashtags_users_network,
@@ -134,6 +147,7 @@ class BipartiteGraph(PipelineBase):
 
     def __get_user_hashtag_graph(self):
         if not self.datasources.files.exists('bipartite_graph', 'get_user_hashtag_graph', 'graph', 'gexf'):
+            import networkx as nx
             hashtags_users_network = self.datasources.files.read(
                 'bipartite_graph', 'get_user_hashtag_network', 'user_hashtag_network', 'csv')
             users_network = self.datasources.files.read(
@@ -1,12 +1,9 @@
 import logging
+import os
 import numpy as np
-import networkx as nx
 import pandas as pd
 from datetime import datetime
 from pipelines.helper import str_to_list
-
-from scipy.signal import find_peaks
-
 from pipelines.pipeline_base import PipelineBase
 
 logger = logging.getLogger(__name__)
@@ -32,6 +29,11 @@ class ContextDetector(PipelineBase):
                     'index': False
                 }
             },
+            {
+                'stage_name': 'hashtags_frequency',
+                'file_name': 'hashtags_frequency',
+                'file_extension': 'npz'
+            },
             {
                 'stage_name': 'find_peaks',
                 'file_name': 'hashtags_peaks',
@@ -94,77 +96,50 @@ class ContextDetector(PipelineBase):
             'context_detector', files, tasks, datasources)
 
     def __hashtags_frequency(self):
-        if not self.datasources.files.exists('context_detector', 'hashtags_frequency', 'hashtags_frequency', 'csv'):
-            from scipy.stats import zscore
-            tweets = self.datasources.files.read(
-                'user_timelines', 'get_user_timelines', 'user_timelines', 'csv')[['date', 'hashtags']] \
-                .explode('hashtags').dropna().rename(columns={'hashtags': 'hashtag'})
-            tweets = tweets.groupby('hashtag').resample('D', on='date').size().to_frame('count').reset_index()
-
-            # subtract mean and retain only counts greater than 0
-            tweets = tweets.loc[tweets['count'] > 0]
-            tweets['count'] = zscore(tweets['count'])
-            tweets = tweets.loc[tweets['count'] > 0]
+        if not self.datasources.files.exists(
+                'context_detector', 'hashtags_frequency', 'hashtags_frequency', 'csv') or \
+                not self.datasources.files.exists(
+                    'context_detector', 'hashtags_frequency', 'hashtags_frequency', 'npz'):
+            from pipelines.hashtag_frequency import HashtagFrequency
+            if self.memory_budget is None:
+                tweets = self.datasources.files.read(
+                    'user_timelines', 'get_user_timelines', 'user_timelines', 'csv')[['date', 'hashtags']]
+                hashtags_frequency = HashtagFrequency.from_tweets(tweets)
+            else:
+                # timelines over the memory budget are counted in partitions by hashtag and day spilled to disk
+                from pipelines.partitioned_aggregation import PartitionedAggregation
+                chunks = (chunk[['date', 'hashtags']] for chunk in self.datasources.files.read_chunks(
+                    'user_timelines', 'get_user_timelines', 'user_timelines', 'csv'))
+                hashtags_frequency = HashtagFrequency.from_day_counts(PartitionedAggregation.aggregate(
+                    chunks, self.memory_budget, HashtagFrequency.day_counts, HashtagFrequency.day_counts,
+                    lambda counts: counts.groupby(['hashtag', 'date'], as_index=False)['count'].sum(),
+                    ['hashtag', 'date'], os.path.join(self.datasources.output_path, 'spill')))
+
+            # (hashtag x day) counts, subtract mean and retain only counts greater than 0
+            hashtags_frequency = hashtags_frequency.zscore()
 
             self.datasources.files.write(
-                tweets, 'context_detector', 'hashtags_frequency', 'hashtags_frequency', 'csv')
+                hashtags_frequency.to_frame(), 'context_detector', 'hashtags_frequency', 'hashtags_frequency', 'csv')
+            self.datasources.files.write(
+                hashtags_frequency.to_arrays(), 'context_detector', 'hashtags_frequency', 'hashtags_frequency', 'npz')
 
     def __find_peaks(self):
         if not self.datasources.files.exists('context_detector', 'find_peaks', 'hashtags_peaks', 'csv'):
-            # get bounds of the peak
-            def get_bound(peak, t_series, t, direction):
-                k = 0
-                bound = peak
-                current = bound - 1 if direction == 'l' else bound + 1
-
-                while ((current > 0 and direction == 'l') or
-                       (current < t_series.size - 1 and direction == 'r')) \
-                        and k <= t:
-                    current = bound - k - 1 if direction == 'l' else bound + k + 1
-                    if t_series[current] > 0:
-                        bound = current
-                        k = 0
-                    else:
-                        k += 1
-
-                return bound
-
-            hashtags = self.datasources.files.read(
-                'context_detector', 'hashtags_frequency', 'hashtags_frequency', 'csv')
-
-            hashtag_peaks = []
-            for hashtag, timeline in hashtags.groupby('hashtag'):
-                timeline = timeline.set_index('date')['count']
-                timeline = timeline.reindex(pd.date_range(timeline.index.min(), timeline.index.max()), fill_value=0)
-                peaks = find_peaks(
-                    timeline, height=timeline[timeline > 0].quantile(.9))[0]
-
-                if peaks.size:
-                    tolerance = 1
-
-                    for p in peaks:
-                        left_bound = get_bound(p, timeline, tolerance, 'l')
-                        right_bound = get_bound(p, timeline, tolerance, 'r')
-
-                        hashtag_peaks.append({
-                            'hashtag': hashtag,
-                            'peak_value': timeline.iloc[p],
-                            'peak_date': timeline.index[p].date(),
-                            'peak_width': right_bound - left_bound + 1,
-                            'start_date': timeline.index[left_bound].date(),
-                            'end_date': timeline.index[right_bound].date()
-                        })
-
-            hashtag_peaks = pd.DataFrame(hashtag_peaks) \
+            from pipelines.hashtag_frequency import HashtagFrequency
+            from pipelines.peak_detection import PeakDetection
+            hashtags_frequency = HashtagFrequency.from_arrays(self.datasources.files.read(
+                'context_detector', 'hashtags_frequency', 'hashtags_frequency', 'npz'))
+
+            # find peaks and their bounds for all hashtags at once
+            hashtag_peaks = PeakDetection(hashtags_frequency, tolerance=1).find_peaks()
+
+            hashtag_peaks = hashtag_peaks \
                 .sort_values(['hashtag', 'peak_value', 'peak_width'], ascending=[True, False, False]) \
                 .drop_duplicates(['hashtag', 'start_date', 'end_date'], keep='first').reset_index(drop=True)
 
             self.datasources.files.write(
                 hashtag_peaks, 'context_detector', 'find_peaks', 'hashtags_peaks', 'csv')
 
-            # find peaks
-            # https://docs.scipy.org/doc/scipy/reference/generated/scipy.signal.peak_widths.html#scipy.signal.peak_widths
-
     def __get_ranked_users_with_hashtags(self):
         if not self.datasources.files.exists(
                 'context_detector', 'get_ranked_users_with_hashtags', 'ranked_users_hashtags', 'csv'):
@@ -189,8 +164,39 @@ class ContextDetector(PipelineBase):
                 ranked_users_hashtags,
                 'context_detector', 'get_ranked_users_with_hashtags', 'ranked_users_hashtags', 'csv')
 
+    @staticmethod
+    def __correlate_peaks(peaks, min_overlap=.5):
+        # hashtags are correlated when their peaks overlap for more than min_overlap of the shortest peak
+        starts = peaks['start_date'].values.astype('datetime64[D]').astype(np.int64)
+        ends = peaks['end_date'].values.astype('datetime64[D]').astype(np.int64)
+        hashtags = peaks['hashtag'].tolist()
+
+        # sweep peaks by start date, each peak is compared only with the following ones starting before its end
+        order = np.argsort(starts, kind='mergesort')
+        starts, ends = starts[order], ends[order]
+        no_candidates = np.searchsorted(starts, ends, side='right') - np.arange(order.size) - 1
+        i = np.repeat(np.arange(order.size), no_candidates)
+        j = i + 1 + np.arange(i.size) - np.repeat(np.cumsum(no_candidates) - no_candidates, no_candidates)
+
+        overlap = np.minimum(ends[i], ends[j]) - starts[j] + 1
+        shortest = np.minimum(ends[i] - starts[i], ends[j] - starts[j]) + 1
+        is_correlated = overlap / shortest > min_overlap
+
+        correlated = [{h} for h in range(order.size)]
+        for h1, h2 in zip(order[i[is_correlated]], order[j[is_correlated]]):
+            correlated[h1].add(h2)
+            correlated[h2].add(h1)
+
+        # one group for each distinct set of correlated hashtags, in order of appearance
+        corr = []
+        for h_set in dict.fromkeys(frozenset(c) for c in correlated):
+            corr.append([hashtags[h] for h in sorted(h_set)])
+
+        return corr
+
     def get_new_contexts(self):
         if not self.datasources.files.exists('context_detector', 'get_new_contexts', 'new_contexts', 'csv'):
+            import networkx as nx
             graph = self.datasources.files.read(
                 'bipartite_community_detection', 'find_communities', 'multiplex_graph', 'gexf')
             hashtag_peaks = self.datasources.files.read(
@@ -220,23 +226,9 @@ class ContextDetector(PipelineBase):
             # get correlations
             hashtag_peaks.drop_duplicates(
                 subset='hashtag', keep=False, inplace=True)
-            hashtag_peaks['date_range'] = \
-                hashtag_peaks.apply(lambda x: pd.date_range(
-                    x['start_date'].date(), x['end_date'].date()), axis=1)
-
-            corr_groups = {}
-            for name, group in hashtag_peaks.groupby('community_topic'):
-                g = group.set_index('hashtag', drop=True)['date_range']
-                corr = g.apply(lambda x: g.iloc[x.name:]
-                               .apply(lambda y: np.intersect1d(x, y).size / min(x.size, y.size))) \
-                    .apply(lambda x: x > .5)
-                corr = corr.drop_duplicates().T
-                corr = corr.apply(
-                    lambda x: [corr[x.name][corr[x.name]].index.tolist()]).reset_index(drop=True)
-                corr = corr.values.tolist()
-                # hack to flatten lists
-                corr = [item for sublist in corr for item in sublist]
-                corr_groups[name] = corr
+
+            corr_groups = {name: self.__correlate_peaks(group)
+                           for name, group in hashtag_peaks.groupby('community_topic')}
             corr_groups = pd.Series(corr_groups).rename('context_hashtags').explode().to_frame()
 
             # rank & order hashtags
@@ -246,51 +238,53 @@ class ContextDetector(PipelineBase):
                 (ranked_users_hashtags['weight'] - ranked_users_hashtags['weight'].min()) / \
                 (ranked_users_hashtags['weight'].max() - ranked_users_hashtags['weight'].min() * 9 + 1)
 
+            # index hashtags once with the ranks of their users and their peak dates
+            hashtag_index = ranked_users_hashtags.groupby('hashtag', sort=False)['weight'].apply(list) \
+                .rename('weights').to_frame()
+            hashtag_index['weight_sum'] = hashtag_index['weights'].apply(sum)
+            hashtag_index['weight_count'] = hashtag_index['weights'].apply(len)
+            hashtag_index['weight_max'] = hashtag_index['weights'].apply(max)
+            hashtag_index = hashtag_peaks.set_index('hashtag')[['start_date', 'end_date']] \
+                .join(hashtag_index, how='inner').to_dict('index')
+
             corr_groups['hashtag_ranks'] = corr_groups['context_hashtags'].apply(
-                lambda h_list: [ranked_users_hashtags[ranked_users_hashtags['hashtag'] == h]['weight'].tolist()
-                                for h in h_list])
+                lambda h_list: [hashtag_index[h]['weights'] for h in h_list])
 
             # order hashtags
-            corr_groups['hashtag_pairs_name_ranks'] = corr_groups[['context_hashtags', 'hashtag_ranks']].apply(
-                lambda x: sorted(
-                    list(zip(x['context_hashtags'], x['hashtag_ranks'])),
-                    key=lambda y: sum(y[1]),
-                    reverse=True
-                )[:5], axis=1)
-            corr_groups['context_hashtags'] = corr_groups['hashtag_pairs_name_ranks']\
-                .apply(lambda pairs_list: [p[0] for p in pairs_list])
-            corr_groups['hashtag_ranks'] = corr_groups['hashtag_pairs_name_ranks']\
-                .apply(lambda pairs_list: [p[1] for p in pairs_list])
+            corr_groups['context_hashtags'] = corr_groups['context_hashtags'].apply(
+                lambda h_list: sorted(h_list, key=lambda h: hashtag_index[h]['weight_sum'], reverse=True)[:5])
+            corr_groups['hashtag_ranks'] = corr_groups['context_hashtags'].apply(
+                lambda h_list: [hashtag_index[h]['weights'] for h in h_list])
 
             corr_groups['h_concat'] = corr_groups['context_hashtags'].apply(lambda x: ''.join(x))
             print('before ' + str(corr_groups.shape[0]))
             corr_groups.drop_duplicates('h_concat', inplace=True)
             print('after ' + str(corr_groups.shape[0]))
-            corr_groups.drop(columns=['h_concat', 'hashtag_pairs_name_ranks'], inplace=True)
+            corr_groups.drop(columns='h_concat', inplace=True)
 
             # add dates to contexts
             corr_groups['start_date'] = corr_groups['context_hashtags'].apply(
-                lambda h_list: min([hashtag_peaks[hashtag_peaks['hashtag'] == h]['start_date'].values
-                                    for h in h_list])[0])
+                lambda h_list: min(hashtag_index[h]['start_date'] for h in h_list))
             corr_groups['end_date'] = corr_groups['context_hashtags'].apply(
-                lambda h_list: max([hashtag_peaks[hashtag_peaks['hashtag'] == h]['end_date'].values
-                                    for h in h_list])[0])
+                lambda h_list: max(hashtag_index[h]['end_date'] for h in h_list))
 
             # rank candidate contexts
-            corr_groups['context_rank'] = corr_groups['hashtag_ranks'].apply(
-                lambda r_list: sum([sum(r) / len(r) for r in r_list]) / len(r_list))
+            corr_groups['context_rank'] = corr_groups['context_hashtags'].apply(
+                lambda h_list: sum([hashtag_index[h]['weight_sum'] / hashtag_index[h]['weight_count']
+                                    for h in h_list]) / len(h_list))
 
-            corr_groups['context_rank_2'] = corr_groups['hashtag_ranks'].apply(
-                lambda r_list: sum([len(r) for r in r_list]) / len(r_list))
+            corr_groups['context_rank_2'] = corr_groups['context_hashtags'].apply(
+                lambda h_list: sum([hashtag_index[h]['weight_count'] for h in h_list]) / len(h_list))
 
-            corr_groups['context_rank_3'] = corr_groups['hashtag_ranks'].apply(
-                lambda r_list: sum([max(r) for r in r_list]) / len(r_list))
+            corr_groups['context_rank_3'] = corr_groups['context_hashtags'].apply(
+                lambda h_list: sum([hashtag_index[h]['weight_max'] for h in h_list]) / len(h_list))
 
-            corr_groups['context_rank_4'] = corr_groups['hashtag_ranks'].apply(
-                lambda r_list: max([max(r) for r in r_list]))
+            corr_groups['context_rank_4'] = corr_groups['context_hashtags'].apply(
+                lambda h_list: max([hashtag_index[h]['weight_max'] for h in h_list]))
 
-            corr_groups['context_rank_5'] = corr_groups['hashtag_ranks'].apply(
-                lambda r_list: sum([len(r) * max(r) for r in r_list]) / len(r_list))
+            corr_groups['context_rank_5'] = corr_groups['context_hashtags'].apply(
+                lambda h_list: sum([hashtag_index[h]['weight_count'] * hashtag_index[h]['weight_max']
+                                    for h in h_list]) / len(h_list))
 
             # sort by rank 5
             corr_groups.sort_values(by='context_rank_5', inplace=True, ascending=False)
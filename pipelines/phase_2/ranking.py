@@ -1,14 +1,40 @@
 import logging
 import pandas as pd
-from sqlalchemy import func, desc, and_
-from datasources.database import User, Profile, Graph, Partition, Community, UserCommunity, UserContext
+from sqlalchemy import func, and_
+from sqlalchemy.exc import IntegrityError
+from datasources.database import User, Profile, Graph, Partition, Community, UserCommunity, UserContext, UserRank
 from pipelines.pipeline_base import PipelineBase
 
 logger = logging.getLogger(__name__)
 
 
+def rank_1(users):
+    # sum of 1 / indegree_centrality (1 if always undefined) and of topical_focus over communities x contexts,
+    # users without communities or contexts are not ranked
+    return ((users['no_contexts'] * users['inverse_indegree_centrality']).fillna(1) +
+            (users['no_communities'] * users['topical_focus']).fillna(0)) \
+        .where(users['no_communities'] > 0).round(decimals=3)
+
+
+def rank_2(users):
+    return abs(users['follower_rank'] - 1) * (users['topical_attachment'] + users['indegree_centrality'])
+
+
+def rank_3(users):
+    return abs(users['follower_rank'] - 1) * (users['topical_attachment'] + 1 / (users['indegree_centrality'] + 1))
+
+
 class Ranking(PipelineBase):
+    # rank formulas computed from the same per-user features, each one is written to its own rank file; a
+    # pipeline ranks with the formulas registered when it is created
+    rank_formulas = {
+        'rank_1': rank_1,
+        'rank_2': rank_2,
+        'rank_3': rank_3
+    }
+
     def __init__(self, datasources):
+        self.rank_formulas = dict(Ranking.rank_formulas)
         files = [
             {
                 'stage_name': 'get_active_users',
@@ -21,36 +47,12 @@ class Ranking(PipelineBase):
                     },
                     'index_col': 'id'
                 }
-            },
-            {
-                'stage_name': 'rank_1',
-                'file_name': 'rank_1',
-                'file_extension': 'csv',
-                'r_kwargs': {
-                    'dtype': {
-                        'id': 'uint32',
-                        'user_name': str,
-                        'rank': float
-                    },
-                    'index_col': 'id'
-                }
-            },
-            {
-                'stage_name': 'rank_2',
-                'file_name': 'rank_2',
-                'file_extension': 'csv',
-                'r_kwargs': {
-                    'dtype': {
-                        'id': 'uint32',
-                        'user_name': str,
-                        'rank': float
-                    },
-                    'index_col': 'id'
-                }
-            },
+            }
+        ]
+        files += [
             {
-                'stage_name': 'rank_3',
-                'file_name': 'rank_3',
+                'stage_name': rank_name,
+                'file_name': rank_name,
                 'file_extension': 'csv',
                 'r_kwargs': {
                     'dtype': {
@@ -60,11 +62,15 @@ class Ranking(PipelineBase):
                     },
                     'index_col': 'id'
                 }
-            }
+            } for rank_name in self.rank_formulas
         ]
-        tasks = [self.__get_active_users, [self.__rank_1, self.__rank_2, self.__rank_3]]
+        tasks = [self.__get_active_users, self.__rank, self.__add_ranks]
         super(Ranking, self).__init__('ranking', files, tasks, datasources)
 
+    @staticmethod
+    def register_rank_formula(rank_name, rank_formula):
+        Ranking.rank_formulas[rank_name] = rank_formula
+
     @staticmethod
     def __min_max(df):
         min = df.min()
@@ -86,81 +92,83 @@ class Ranking(PipelineBase):
 
             self.datasources.files.write(active_users, 'ranking', 'get_active_users', 'active_users', 'csv')
 
-    def __rank_1(self):
-        if not self.datasources.files.exists('ranking', 'rank_1', 'rank_1', 'csv'):
-            active_users = self.datasources.files\
-                .read('ranking', 'get_active_users', 'active_users', 'csv').index.tolist()
-
-            with self.datasources.database.session_scope() as session:
-                rank = pd.read_sql(session.query(User.id, User.user_name,
-                                                 (func.ifnull(func.sum(1 / UserCommunity.indegree_centrality), 1) +
-                                                  func.ifnull(func.sum(UserContext.topical_focus), 0)).label('rank'))
-                                   .join(UserCommunity).join(UserContext)
+    def __get_user_features(self):
+        active_users = self.datasources.files \
+            .read('ranking', 'get_active_users', 'active_users', 'csv').index.tolist()
+
+        with self.datasources.database.session_scope() as session:
+            # user communities with the user metrics of the context they belong to
+            data = pd.read_sql(session.query(User.id, User.user_name,
+                                             Profile.follower_rank,
+                                             UserContext.topical_attachment,
+                                             UserCommunity.indegree_centrality)
+                               .join(Profile, User.id == Profile.user_id)
+                               .join(UserCommunity, Profile.user_id == UserCommunity.user_id)
+                               .join(Community, UserCommunity.community_id == Community.id)
+                               .join(Partition, Community.partition_id == Partition.id)
+                               .join(Graph, Partition.graph_id == Graph.id)
+                               .join(UserContext, and_(Graph.context_id == UserContext.context_id,
+                                                       User.id == UserContext.user_id))
+                               .filter(User.id.in_(active_users)).statement,
+                               con=session.bind)
+
+            # all communities and all contexts of a user, with or without a profile
+            communities = pd.read_sql(session.query(User.id, User.user_name,
+                                                    func.count().label('no_communities'),
+                                                    func.sum(1 / UserCommunity.indegree_centrality)
+                                                    .label('inverse_indegree_centrality'))
+                                      .join(UserCommunity, User.id == UserCommunity.user_id)
+                                      .filter(User.id.in_(active_users))
+                                      .group_by(User.id, User.user_name).statement,
+                                      con=session.bind, index_col=['id', 'user_name'])
+            contexts = pd.read_sql(session.query(User.id, User.user_name,
+                                                 func.count().label('no_contexts'),
+                                                 func.sum(UserContext.topical_focus).label('topical_focus'))
+                                   .join(UserContext, User.id == UserContext.user_id)
                                    .filter(User.id.in_(active_users))
-                                   .group_by(UserCommunity.user_id)
-                                   .order_by(desc('rank'), User.user_name.asc()).statement,
-                                   con=session.bind).round(decimals=3)
+                                   .group_by(User.id, User.user_name).statement,
+                                   con=session.bind, index_col=['id', 'user_name'])
 
-            self.datasources.files.write(rank.set_index('id', drop=True), 'ranking', 'rank_1', 'rank_1', 'csv')
+        data['topical_attachment'] = self.__min_max(data['topical_attachment'])
 
-    def __rank_2(self):
-        if not self.datasources.files.exists('ranking', 'rank_2', 'rank_2', 'csv'):
-            active_users = self.datasources.files\
-                .read('ranking', 'get_active_users', 'active_users', 'csv').index.tolist()
+        users = data.groupby(['id', 'user_name']).agg(
+            follower_rank=('follower_rank', 'first'),
+            topical_attachment=('topical_attachment', 'sum'),
+            indegree_centrality=('indegree_centrality', 'sum'))
 
-            with self.datasources.database.session_scope() as session:
-                data = pd.read_sql(session.query(User.id, User.user_name,
-                                                 Profile.follower_rank,
-                                                 UserContext.topical_attachment,
-                                                 UserCommunity.indegree_centrality)
-                                   .join(Profile, User.id == Profile.user_id)
-                                   .join(UserCommunity, Profile.user_id == UserCommunity.user_id)
-                                   .join(Community, UserCommunity.community_id == Community.id)
-                                   .join(Partition, Community.partition_id == Partition.id)
-                                   .join(Graph, Partition.graph_id == Graph.id)
-                                   .join(UserContext, and_(Graph.context_id == UserContext.context_id,
-                                                           User.id == UserContext.user_id))
-                                   .filter(User.id.in_(active_users)).statement,
-                                   con=session.bind, index_col='id')
-
-            data['topical_attachment'] = self.__min_max(data['topical_attachment'])
-
-            rank = data.groupby(['id', 'user_name']) \
-                .apply(lambda x: abs(x['follower_rank'].head(1) - 1) *
-                       (x['topical_attachment'].sum() + x['indegree_centrality'].sum())) \
-                .reset_index(level=[0, 1]).rename(columns={'follower_rank': 'rank'}) \
-                .sort_values(by=['rank', 'user_name'], ascending=[False, True])
-            rank.reset_index(drop=True, inplace=True)
-
-            self.datasources.files.write(rank.set_index('id', drop=True), 'ranking', 'rank_2', 'rank_2', 'csv')
-
-    def __rank_3(self):
-        if not self.datasources.files.exists('ranking', 'rank_3', 'rank_3', 'csv'):
-            active_users = self.datasources.files\
-                .read('ranking', 'get_active_users', 'active_users', 'csv').index.tolist()
+        return users.join(communities.join(contexts, how='inner'), how='outer')
 
-            with self.datasources.database.session_scope() as session:
-                data = pd.read_sql(session.query(User.id, User.user_name,
-                                                 Profile.follower_rank,
-                                                 UserContext.topical_attachment,
-                                                 UserCommunity.indegree_centrality)
-                                   .join(Profile, User.id == Profile.user_id)
-                                   .join(UserCommunity, Profile.user_id == UserCommunity.user_id)
-                                   .join(Community, UserCommunity.community_id == Community.id)
-                                   .join(Partition, Community.partition_id == Partition.id)
-                                   .join(Graph, Partition.graph_id == Graph.id)
-                                   .join(UserContext, and_(Graph.context_id == UserContext.context_id,
-                                                           User.id == UserContext.user_id))
-                                   .filter(User.id.in_(active_users)).statement,
-                                   con=session.bind, index_col='id')
-
-            data['topical_attachment'] = self.__min_max(data['topical_attachment'])
-
-            rank = data.groupby(['id', 'user_name']) \
-                .apply(lambda x: abs(x['follower_rank'].head(1) - 1) *
-                       (x['topical_attachment'].sum() + 1 / (x['indegree_centrality'].sum() + 1))) \
-                .reset_index(level=[0, 1]).rename(columns={'follower_rank': 'rank'}) \
-                .sort_values(by=['rank', 'user_name'], ascending=[False, True])
-            rank.reset_index(drop=True, inplace=True)
-
-            self.datasources.files.write(rank.set_index('id', drop=True), 'ranking', 'rank_3', 'rank_3', 'csv')
+    def __rank(self):
+        rank_names = [rank_name for rank_name in self.rank_formulas
+                      if not self.datasources.files.exists('ranking', rank_name, rank_name, 'csv')]
+
+        if rank_names:
+            users = self.__get_user_features()
+
+            for rank_name in rank_names:
+                logger.debug(f'compute rank {rank_name}')
+
+                # users without the features of a rank are not ranked by it
+                rank = self.rank_formulas[rank_name](users).dropna().rename('rank').reset_index() \
+                    .sort_values(by=['rank', 'user_name'], ascending=[False, True])
+
+                self.datasources.files.write(
+                    rank.set_index('id', drop=True), 'ranking', rank_name, rank_name, 'csv')
+
+    def __add_ranks(self):
+        for rank_name in self.rank_formulas:
+            rank = self.datasources.files.read('ranking', rank_name, rank_name, 'csv')
+
+            try:
+                with self.datasources.database.session_scope() as session:
+                    # user ids are the global user ids
+                    rank_records = [{'user_id': user_id, 'name': rank_name, 'score': score}
+                                    for user_id, score in zip(rank.index.tolist(), rank['rank'].tolist())]
+
+                    session.query(UserRank).filter(UserRank.name == rank_name).delete()
+                    session.bulk_insert_mappings(UserRank, rank_records)
+                logger.debug(f'rank {rank_name} successfully persisted')
+            except IntegrityError:
+                # the top ranked users of the next pipelines are read from the database
+                logger.error(f'rank {rank_name} violates a constraint and could not be added')
+                raise
@@ -2,7 +2,6 @@ import logging
 import pandas as pd
 from datetime import datetime
 from pipelines.pipeline_base import PipelineBase
-from pipelines.helper import str_to_list
 
 logger = logging.getLogger(__name__)
 
@@ -26,20 +25,19 @@ class UserTimelines(PipelineBase):
                         'no_replies': 'uint32',
                         'is_retweet': bool,
                         'is_media': bool,
-
-                    },
-                    'converters': {
-                        'hashtags': str_to_list,
-                        'urls': str_to_list,
-                        'mentions': str_to_list,
-                        'replies': str_to_list
+                        # list columns are kept as written, see RaggedArray
+                        'hashtags': str,
+                        'urls': str,
+                        'mentions': str,
+                        'replies': str
                     },
                     'parse_dates': ['date'],
                     'date_parser': lambda x: datetime.strptime(x, '%Y-%m-%d %H:%M:%S')
                 },
                 'w_kwargs': {
                     'index': False
-                }
+                },
+                'compression': 'gzip'
             }
         ]
         tasks = [self.__get_user_timelines]
@@ -49,8 +47,10 @@ class UserTimelines(PipelineBase):
         if not self.datasources.files.exists('user_timelines', 'get_user_timelines', 'user_timelines', 'csv'):
             cd_config = self.datasources.context_detection.get_config()
 
-            rank = self.datasources.files.read('ranking', cd_config['rank'], cd_config['rank'], 'csv')['user_name'] \
-                .head(cd_config['top_no_users']).tolist()
+            rank = self.datasources.database.get_top_ranked_users(
+                cd_config['rank'], limit=cd_config['top_no_users'])['user_name'].tolist()
+            if not rank:
+                raise ValueError(f'rank {cd_config["rank"]} has no users in the database, run ranking first')
 
             tw_df = pd.DataFrame.from_records(
                 self.datasources.tw_api.get_user_timelines(
@@ -1,16 +1,100 @@
 import logging
-from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler
+from concurrent.futures import Future, FIRST_COMPLETED, wait
+import multiprocessing
+import os
+import resource
+import threading
 import time
+from datasources.run_report import counters
 
 logger = logging.getLogger(__name__)
 
 
+def cpu_bound(task):
+    # mark a task to run in a worker process when in a parallel group
+    task.is_cpu_bound = True
+    return task
+
+
+def task_timeout(timeout):
+    # mark a task to fail after timeout seconds of execution
+    def set_timeout(task):
+        task.timeout = timeout
+        return task
+    return set_timeout
+
+
+def init_worker(log_queue, log_level):
+    # spawned workers start without the logging configuration of their parent, their records go to its handlers
+    root_logger = logging.getLogger()
+    root_logger.handlers = [QueueHandler(log_queue)]
+    root_logger.setLevel(log_level)
+
+
+def handle_worker_logs(log_queue):
+    # records of the worker processes are handled by the loggers of the parent, up to a None
+    for record in iter(log_queue.get, None):
+        logging.getLogger(record.name).handle(record)
+
+
+def set_future(future, result=None, exception=None):
+    # outcome of a worker process task, unless its future was cancelled
+    if future.set_running_or_notify_cancel():
+        if exception is None:
+            future.set_result(result)
+        else:
+            future.set_exception(exception)
+
+
+def execute_in_thread(thread_name, func, *args):
+    # daemon thread: a task abandoned by its group (failure, timeout) runs on, but doesn't keep the interpreter
+    # alive, it is stopped abruptly at exit
+    future = Future()
+
+    def run():
+        if future.set_running_or_notify_cancel():
+            try:
+                future.set_result(func(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+    threading.Thread(target=run, name=thread_name, daemon=True).start()
+
+    return future
+
+
+def execute_process_task(pipeline_class, pipeline_args, task_name, input_path, output_path, run_id, retry=0,
+                         delay=0):
+    # the worker rebuilds its pipeline, inputs and outputs are shared through the file artifacts
+    from datasources import Datasources
+
+    datasources = Datasources(input_path, output_path, reset_db=False, run_id=run_id)
+    # the pipelines of the artifacts the task reads only add their file models
+    for input_pipeline_class in pipeline_class.input_pipelines:
+        input_pipeline_class(datasources, *pipeline_args)
+    pipeline = pipeline_class(datasources, *pipeline_args)
+    pipeline.execute_task(task_name, retry, delay)
+
+
 class PipelineBase:
-    def __init__(self, pipeline_name, files, tasks, datasources, retries=1):
+    # pipelines whose artifacts the cpu bound tasks read, a worker process adds their file models
+    input_pipelines = []
+
+    def __init__(self, pipeline_name, files, tasks, datasources, retries=1, backoff=1):
         self.pipeline_name = pipeline_name
         self.tasks = tasks
         self.datasources = datasources
-        self.retries = retries
+        # attempts of each task, retries wait backoff * 2^(attempt - 1) seconds
+        self.retries = int(os.environ.get('TNA_TASK_RETRIES', retries))
+        self.backoff = backoff
+        # cpu bound tasks of parallel groups run in worker "process"es or in "thread"s
+        self.cpu_executor = os.environ.get('TNA_CPU_EXECUTOR', 'process')
+        # default timeout (s) of the tasks without their own
+        self.timeout = float(os.environ['TNA_TASK_TIMEOUT']) if 'TNA_TASK_TIMEOUT' in os.environ else None
+        # memory (bytes, or with a K, M, G suffix) of a stage before it switches to out-of-core processing
+        self.memory_budget = PipelineBase.__parse_size(os.environ['TNA_MEMORY_BUDGET']) \
+            if os.environ.get('TNA_MEMORY_BUDGET') else None
 
         files = [dict(f, **{'pipeline_name': pipeline_name}) for f in files]
         self.datasources.files.add_file_models(files)
@@ -23,29 +107,149 @@ class PipelineBase:
         for task in self.tasks:
             if isinstance(task, list):
                 logger.debug(f'parallel execution of [{", ".join(t.__name__ for t in task)}]')
-                with ThreadPoolExecutor() as executor:
-                    for t in task:
-                        executor.submit(t)
+                self.__group_execution(task)
             else:
-                self.__task_execution(task)
+                self.__group_execution([task])
 
         logger.info(f'END PIPELINE {self.pipeline_name}')
 
-    def __task_execution(self, task):
-        logger.info(f'START TASK {task.__name__}')
+    def execute_task(self, task_name, retry=0, delay=0):
+        task = getattr(self, f'_{type(self).__name__}{task_name}' if task_name.startswith('__') else task_name)
+        self.__task_execution(task, retry, delay)
+
+    def __is_process_task(self, task):
+        # cached tasks only check their artifacts, a worker process is not worth it
+        return getattr(task, 'is_cpu_bound', False) and self.cpu_executor == 'process' and \
+            not self.datasources.files.stage_exists(self.pipeline_name, task.__name__.lstrip('_'))
+
+    def __group_execution(self, tasks):
+        # tasks run as futures, failed ones are retried and the first final failure or timeout cancels the group
+        process_tasks = [t for t in tasks if self.__is_process_task(t)]
+        pipeline_args = (self.context_name,) if hasattr(self, 'context_name') else ()
+
+        process_pool = None
+        if process_tasks:
+            # spawn: forked workers would inherit the locks held by the threads of the parent
+            mp_context = multiprocessing.get_context('spawn')
+            log_queue = mp_context.Queue()
+            log_thread = threading.Thread(target=handle_worker_logs, args=(log_queue,), daemon=True)
+            log_thread.start()
+            process_pool = mp_context.Pool(len(process_tasks), initializer=init_worker,
+                                           initargs=(log_queue, logging.getLogger().level))
+        futures = {}
+
+        def submit(task, retry=0):
+            delay = self.backoff * 2 ** (retry - 1) if retry else 0
+            if task in process_tasks:
+                future = Future()
+                process_pool.apply_async(execute_process_task,
+                                         (type(self), pipeline_args, task.__name__, self.datasources.input_path,
+                                          self.datasources.output_path, self.datasources.run_report.run_id, retry,
+                                          delay),
+                                         callback=lambda result, f=future: set_future(f, result),
+                                         error_callback=lambda e, f=future: set_future(f, exception=e))
+            else:
+                future = execute_in_thread(f'{self.pipeline_name}.{task.__name__.lstrip("_")}',
+                                           self.__task_execution, task, retry, delay)
+
+            timeout = getattr(task, 'timeout', self.timeout)
+            futures[future] = (task, retry, time.time() + delay + timeout if timeout else None)
 
         is_executed = False
-        retries = 0
-        while not is_executed:
-            try:
-                task()
-                is_executed = True
-                logger.debug(f'SUCCESSFUL TASK {task.__name__}')
-            except Exception as e:
-                logger.exception(f'ERROR TASK {task.__name__}')
-                retries += 1
-                time.sleep(retries)
-                if retries >= self.retries:
-                    raise e
+        try:
+            for t in tasks:
+                submit(t)
+
+            while futures:
+                deadlines = [d for _, _, d in futures.values() if d]
+                done, _ = wait(futures, timeout=max(min(deadlines) - time.time(), 0) if deadlines else None,
+                               return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    task, retry, _ = futures.pop(future)
+                    try:
+                        future.result()
+                    except Exception:
+                        logger.exception(f'ERROR TASK {task.__name__} (attempt {retry + 1} of {self.retries})')
+                        if retry + 1 >= self.retries:
+                            raise
+                        submit(task, retry + 1)
 
+                for task, _, deadline in futures.values():
+                    if deadline and deadline <= time.time():
+                        raise TimeoutError(f'task {task.__name__} timed out '
+                                           f'after {getattr(task, "timeout", self.timeout)} s')
+            is_executed = True
+        finally:
+            # fail fast: pending tasks are cancelled, running threads are abandoned and worker processes terminated
+            if not is_executed and futures:
+                logger.error(f'cancel tasks [{", ".join(t.__name__ for t, _, _ in futures.values())}]')
+            for future in futures:
+                future.cancel()
+            if process_pool:
+                if is_executed:
+                    process_pool.close()
+                else:
+                    # a worker terminated while logging may leave the log queue locked, it is waited for shortly
+                    process_pool.terminate()
+                    log_queue.cancel_join_thread()
+                process_pool.join()
+                log_queue.put(None)
+                log_thread.join(timeout=None if is_executed else 5)
+
+    def __task_execution(self, task, retry=0, delay=0):
+        time.sleep(delay)
+        logger.info(f'START TASK {task.__name__}')
+        self.__instrumented_execution(task, retry)
         logger.info(f'END TASK {task.__name__}')
+
+    def __instrumented_execution(self, task, retry=0):
+        # wall and cpu time, peak memory growth, files and api usage of the task (and of its helper threads)
+        start_time = time.time()
+        start_cpu_time = PipelineBase.__cpu_time()
+        start_max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        context_name = getattr(self, 'context_name', None)
+        is_executed = False
+        task_counters = {}
+        try:
+            with counters.scope(task_counters):
+                if self.datasources.profiling.is_enabled(self.pipeline_name, task.__name__):
+                    self.datasources.profiling.run(task, self.pipeline_name, context_name)
+                else:
+                    task()
+            is_executed = True
+        finally:
+            task_record = {
+                'task_name': task.__name__,
+                'retry': retry,
+                'is_executed': is_executed,
+                'start_time': round(start_time, 4),
+                'wall_time': round(time.time() - start_time, 4),
+                'cpu_time': round(PipelineBase.__cpu_time() - start_cpu_time, 4),
+                'max_rss_delta_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - start_max_rss,
+                'bytes_read': 0,
+                'bytes_written': 0,
+                'files_read': 0,
+                'files_written': 0,
+                'artifact_hits': 0,
+                'file_cache_hits': 0,
+                'api_calls': 0,
+                'api_cache_hits': 0,
+                'api_rate_limited': 0
+            }
+            task_record.update(task_counters)
+
+            self.datasources.run_report.add(self.pipeline_name, task_record, context_name)
+
+    @staticmethod
+    def __parse_size(size):
+        units = {'K': 2 ** 10, 'M': 2 ** 20, 'G': 2 ** 30}
+        size = size.strip().upper().rstrip('B')
+
+        return int(float(size[:-1]) * units[size[-1]]) if size[-1] in units else int(size)
+
+    @staticmethod
+    def __cpu_time():
+        usage = resource.getrusage(resource.RUSAGE_THREAD)
+        return usage.ru_utime + usage.ru_stime
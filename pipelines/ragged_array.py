@@ -0,0 +1,100 @@
+from itertools import chain
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+
+class RaggedArray:
+    # list cells as one flat array of integer codes of their (sorted) unique values and the offsets of each row,
+    # without a python list per cell
+    def __init__(self, codes, offsets, uniques):
+        self.codes = codes
+        self.offsets = offsets
+        self.uniques = uniques
+
+    @staticmethod
+    def from_values(values, lengths):
+        codes, uniques = pd.factorize(np.asarray(values, dtype=object), sort=True)
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+
+        return RaggedArray(codes.astype(np.int64), offsets, np.asarray(uniques, dtype=object))
+
+    @staticmethod
+    def from_lists(lists):
+        lengths = np.fromiter(map(len, lists), dtype=np.int64, count=len(lists))
+
+        return RaggedArray.from_values(list(chain.from_iterable(lists)), lengths)
+
+    @staticmethod
+    def from_strings(strings):
+        # cells as written by to_csv ("['a', 'b']", parsed as str_to_list), all split at once
+        strings = pd.Series(strings, dtype=object).reset_index(drop=True)
+        is_empty = strings.isna() | (strings == '[]')
+        cells = strings[~is_empty].str.strip('[]').str.replace('\'', '', regex=False)
+
+        lengths = np.zeros(len(strings), dtype=np.int64)
+        lengths[~is_empty.to_numpy()] = cells.str.count(', ').to_numpy(dtype=np.int64) + 1
+        values = ', '.join(cells).split(', ') if len(cells) else []
+
+        return RaggedArray.from_values(values, lengths)
+
+    @staticmethod
+    def from_series(series):
+        # list cells or their csv strings
+        is_string = series.map(lambda cell: isinstance(cell, str)).any()
+
+        return RaggedArray.from_strings(series) if is_string else RaggedArray.from_lists(series.tolist())
+
+    def __len__(self):
+        return self.offsets.size - 1
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    @property
+    def rows(self):
+        # positional row of each value
+        return np.repeat(np.arange(len(self), dtype=np.int64), self.lengths)
+
+    @property
+    def values(self):
+        return self.uniques[self.codes]
+
+    def explode(self, index=None):
+        # values with the index label of their row, empty rows are left out
+        rows = self.rows
+        return pd.Series(self.values, index=index[rows] if index is not None else rows)
+
+    def isin(self, values):
+        # rows with any of the values
+        is_value = np.isin(self.uniques, list(values))[self.codes]
+
+        return np.bincount(self.rows, weights=is_value, minlength=len(self)) > 0
+
+    def take(self, positions):
+        positions = np.flatnonzero(positions) if np.asarray(positions).dtype == bool else np.asarray(positions)
+        lengths = self.lengths[positions]
+        offsets = np.zeros(positions.size + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        value_positions = np.repeat(self.offsets[positions] - offsets[:-1], lengths) + np.arange(offsets[-1])
+
+        return RaggedArray(self.codes[value_positions], offsets, self.uniques)
+
+    def incidence(self):
+        # (row x unique value) number of occurrences
+        incidence = sp.csr_matrix((np.ones(self.codes.size, dtype=np.int64), self.codes, self.offsets),
+                                  shape=(len(self), self.uniques.size))
+        incidence.sum_duplicates()
+
+        return incidence
+
+    def cooccurrence(self):
+        # (unique value x unique value) products of the occurrences of the two values in each row, summed
+        incidence = self.incidence()
+
+        return incidence.T @ incidence
+
+    def to_lists(self):
+        return [values.tolist() for values in np.split(self.values, self.offsets[1:-1])]
@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from datasources.files.files import Files
+
+
+class FilesTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.files = Files(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_write(self):
+        contents = {
+            # text of tweets is utf-8 whatever the locale
+            'csv': pd.DataFrame({'text': ['tweet \U0001F600', 'τweet']}),
+            'json': [{'text': 'tweet \U0001F600'}],
+            'npz': {'data': np.arange(3)}
+        }
+        for compression in [None, 'gzip']:
+            for file_extension, file_content in contents.items():
+                self.files.add_file_model('pipeline', 'stage', 'file', file_extension, compression=compression,
+                                          w_kwargs={'index': False} if file_extension == 'csv' else None)
+                self.files.write(file_content, 'pipeline', 'stage', 'file', file_extension)
+                read_content = self.files.read('pipeline', 'stage', 'file', file_extension)
+
+                if file_extension == 'csv':
+                    pd.testing.assert_frame_equal(read_content, file_content)
+                elif file_extension == 'npz':
+                    np.testing.assert_array_equal(read_content['data'], file_content['data'])
+                else:
+                    self.assertEqual(read_content, file_content)
+
+    def test_interrupted_write(self):
+        # a failed write leaves neither the file nor its partial content
+        self.files.add_file_model('pipeline', 'stage', 'file', 'json')
+
+        with self.assertRaises(TypeError):
+            self.files.write([{'text': 'tweet'}, object()], 'pipeline', 'stage', 'file', 'json')
+        self.assertFalse(self.files.exists('pipeline', 'stage', 'file', 'json'))
+        self.assertEqual(os.listdir(os.path.join(self.temp_dir.name, 'files', 'pipeline', 'stage')), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
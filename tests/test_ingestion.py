@@ -0,0 +1,49 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from benchmarks.synthetic_data import SyntheticTwitter
+from datasources.tw_api_backends import ReplayBackend
+from ingestion import StreamIngestion
+from orchestrator import Orchestrator
+
+
+class StreamIngestionTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        input_path = os.path.join(self.temp_dir.name, 'input')
+        output_path = os.path.join(self.temp_dir.name, 'output')
+        SyntheticTwitter(1000, 1, stream_share=.2).write_project(os.path.join(input_path, 'project'),
+                                                                 os.path.join(output_path, 'project'), time_scale=0)
+        with open(os.path.join(input_path, 'project', 'stream_ingestion.json'), 'w') as json_file:
+            json.dump({'batch_size': 10, 'batch_interval': .1, 'refresh_interval': 60}, json_file)
+
+        self.orchestrator = Orchestrator('project', input_path, output_path, reset_db=True)
+        for p in Orchestrator.phase_1_pipelines:
+            p(self.orchestrator.datasources, 'context0').execute()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_stream_error(self):
+        # the stream drops after some tweets, they are appended and the error is raised
+        filter_stream = ReplayBackend.filter_stream
+
+        def dropped_stream(backend, track):
+            for i, raw_tw in enumerate(filter_stream(backend, track)):
+                if i == 20:
+                    raise ConnectionError('stream dropped')
+                yield raw_tw
+
+        stream_ingestion = StreamIngestion(self.orchestrator.datasources, 'context0')
+        with mock.patch.object(ReplayBackend, 'filter_stream', dropped_stream):
+            with self.assertRaises(ConnectionError):
+                stream_ingestion.execute()
+
+        self.assertEqual(stream_ingestion.stats['received'], 20)
+        self.assertEqual(stream_ingestion.stats['refreshes'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import os
+import tempfile
+import unittest
+from benchmarks.synthetic_data import SyntheticTwitter
+from orchestrator import Orchestrator
+
+
+class WorkerTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.temp_dir.name, 'input')
+        self.output_path = os.path.join(self.temp_dir.name, 'output')
+        SyntheticTwitter(500, 1).write_project(os.path.join(self.input_path, 'project'),
+                                               os.path.join(self.output_path, 'project'), time_scale=0)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_jobs_of_separate_workers(self):
+        # each job runs in the datasources of its own worker, as on another host
+        for worker_name, pipeline_name in [('worker_1', 'ContextHarvesting'), ('worker_2', 'NetworkCreation')]:
+            orchestrator = Orchestrator('project', self.input_path, self.output_path, reset_db=False)
+            job_queue = orchestrator.datasources.job_queue
+            job_queue.publish([{'context_name': 'context0', 'pipeline_name': pipeline_name, 'depends_on': []}])
+            orchestrator.work(worker_name, poll_interval=0)
+
+            jobs = job_queue.get_jobs()
+            self.assertEqual([(j['worker_name'], j['status'], j['error']) for j in jobs], [(worker_name, 'done', None)])
+
+        nodes = Orchestrator('project', self.input_path, self.output_path, reset_db=False).get_job_pipeline(
+            'NetworkMetrics', 'context0').datasources.files.read(
+            'network_creation', 'create_nodes', 'nodes', 'csv', 'context0')
+        self.assertFalse(nodes.empty)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,5 @@
+import argparse
 import os
-import sys
 from orchestrator import Orchestrator
 
 PROJECT_PATH = os.path.abspath('')
@@ -8,10 +8,23 @@ OUTPUT_PATH = os.path.join(PROJECT_PATH, 'output/')
 
 
 def main():
-    project_name = sys.argv[1]
+    parser = argparse.ArgumentParser(description='twitter network analysis')
+    parser.add_argument('project_name')
+    parser.add_argument('context_name', nargs='?', help='ingest the filtered stream of the context')
+    parser.add_argument('--mode', choices=['local', 'coordinator', 'worker'], default='local',
+                        help='execute the pipelines, publish them as jobs or execute published jobs')
+    parser.add_argument('--worker-name')
+    args = parser.parse_args()
 
-    o = Orchestrator(project_name, INPUT_PATH, OUTPUT_PATH)
-    o.execute()
+    o = Orchestrator(args.project_name, INPUT_PATH, OUTPUT_PATH, reset_db=args.mode != 'worker')
+    if args.context_name:
+        o.stream(args.context_name)
+    elif args.mode == 'coordinator':
+        o.coordinate()
+    elif args.mode == 'worker':
+        o.work(args.worker_name)
+    else:
+        o.execute()
 
 
 if __name__ == '__main__':